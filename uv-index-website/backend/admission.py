@@ -0,0 +1,153 @@
+"""
+Admission control module for UV index website.
+Limits how many requests each route runs at once. Requests beyond the limit
+wait in a bounded queue until a deadline, and are then degraded or shed with
+503 so latency stays bounded under overload instead of every request timing
+out together.
+"""
+
+import math
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, make_response
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded, deadline-limited wait queue"""
+
+    def __init__(self, name, max_concurrent, max_queue=0, queue_timeout=0.5, retry_after=1):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+        self._active = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._degraded = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Try to admit a request, waiting in the queue up to the deadline
+
+        Returns False when the queue is full or the deadline passes.
+        """
+        with self._condition:
+            # Admit straight away only if nobody is already waiting ahead
+            if self._active < self.max_concurrent and not self._waiting:
+                self._active += 1
+                self._admitted += 1
+                return True
+
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                return False
+
+            self._waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timed_out += 1
+                        return False
+                    self._condition.wait(remaining)
+
+                self._active += 1
+                self._admitted += 1
+                self._queued += 1
+                return True
+            finally:
+                self._waiting -= 1
+
+    def release(self):
+        """Release an admitted request's slot"""
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def record_degraded(self):
+        with self._condition:
+            self._degraded += 1
+
+    def stats(self):
+        """Get limiter state and counters"""
+        with self._condition:
+            return {
+                'name': self.name,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'queue_timeout': self.queue_timeout,
+                'active': self._active,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'queued': self._queued,
+                'rejected': self._rejected,
+                'timed_out': self._timed_out,
+                'degraded': self._degraded
+            }
+
+
+def create_limiters(limit_configs):
+    """Create limiters from a dictionary of route name to limit settings"""
+    return {
+        name: AdmissionLimiter(
+            name,
+            int(limits['max_concurrent']),
+            max_queue=int(limits.get('max_queue', 0)),
+            queue_timeout=float(limits.get('queue_timeout', 0.5)),
+            retry_after=limits.get('retry_after', 1)
+        )
+        for name, limits in limit_configs.items()
+    }
+
+
+def overloaded_response(limiter):
+    """Build the 503 response for a request shed by a limiter"""
+    response = jsonify({'error': 'Service is overloaded, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(math.ceil(limiter.retry_after)))
+    return response
+
+
+def admission_control(limiter, degraded=None):
+    """Decorate a view so it only runs within the limiter's concurrency limit
+
+    When a request is not admitted, degraded(view, *args, **kwargs) is called
+    to build a cheaper response if given; if it returns None or no handler is
+    given the request is rejected with 503 and Retry-After.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limiter.acquire():
+                if degraded is not None:
+                    response = degraded(view, *args, **kwargs)
+                    if response is not None:
+                        limiter.record_degraded()
+                        response = make_response(response)
+                        response.headers['X-Degraded'] = 'cached-snapshot'
+                        return response
+                return overloaded_response(limiter)
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except Exception:
+                limiter.release()
+                raise
+
+            # A streamed response keeps working after the view returns, so
+            # its slot is only released once the stream is closed
+            if response.is_streamed:
+                response.call_on_close(limiter.release)
+            else:
+                limiter.release()
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,438 @@
+"""
+UV alerts module for UV index website.
+Keeps UV threshold subscriptions indexed by station and sorted threshold, so
+each new snapshot only visits the subscriptions whose threshold was crossed
+since the previous reading, and delivers the resulting alerts to a sink.
+
+Subscriptions are persisted as an append-only log next to the UV snapshot,
+which every worker replays, and the readings alerts were last evaluated
+against are kept in a state file, so all workers share one set of
+subscriptions and each snapshot's alerts are sent once.
+"""
+
+import json
+import math
+import os
+import queue
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+
+from snapshot_store import write_file_atomically
+
+try:
+    import fcntl
+except ImportError:
+    # Without fcntl (Windows) the files are only safe to share between
+    # threads of one process
+    fcntl = None
+
+# Directions a subscription can be notified on
+ALERT_DIRECTIONS = ('rising', 'falling', 'both')
+
+# Rewrite the subscription log once it holds this many removed entries and
+# more removed than live ones
+COMPACT_MIN_DEAD_RECORDS = 1000
+
+
+class Subscription:
+    """A request to be alerted when a station's UV crosses a threshold"""
+
+    __slots__ = ('id', 'station', 'threshold', 'direction', 'postcode', 'target', 'created_at')
+
+    def __init__(self, id, station, threshold, direction='rising', postcode=None, target=None, created_at=None):
+        self.id = id
+        self.station = station
+        self.threshold = threshold
+        self.direction = direction
+        self.postcode = postcode
+        self.target = target
+        self.created_at = created_at if created_at is not None else time.time()
+
+    def to_dict(self):
+        """Convert Subscription object to dictionary"""
+        return {
+            'id': self.id,
+            'station': self.station,
+            'threshold': self.threshold,
+            'direction': self.direction,
+            'postcode': self.postcode,
+            'target': self.target,
+            'created_at': self.created_at
+        }
+
+
+class StationSubscriptions:
+    """Subscriptions for one station, kept sorted by (threshold, id)"""
+
+    def __init__(self):
+        # Parallel lists, so thresholds can be bisected directly
+        self.thresholds = []
+        self.ids = []
+
+    def _position(self, threshold, subscription_id):
+        """Find where a subscription is, or would be inserted, by bisecting threshold then id"""
+        start = bisect_left(self.thresholds, threshold)
+        end = bisect_right(self.thresholds, threshold, start)
+        return bisect_left(self.ids, subscription_id, start, end)
+
+    def add(self, threshold, subscription_id):
+        position = self._position(threshold, subscription_id)
+        self.thresholds.insert(position, threshold)
+        self.ids.insert(position, subscription_id)
+
+    def remove(self, threshold, subscription_id):
+        position = self._position(threshold, subscription_id)
+        if position < len(self.ids) and self.ids[position] == subscription_id:
+            del self.thresholds[position]
+            del self.ids[position]
+
+    def crossed(self, previous, current):
+        """Get the IDs of subscriptions with a threshold crossed between two readings
+
+        A threshold t is crossed rising when previous < t <= current, and
+        falling when current < t <= previous.
+        """
+        low, high = min(previous, current), max(previous, current)
+        return self.ids[bisect_right(self.thresholds, low):bisect_right(self.thresholds, high)]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_subscriptions(cls, subscriptions):
+        """Build the sorted lists in one pass, rather than inserting one at a time"""
+        station_subscriptions = cls()
+        entries = sorted((subscription.threshold, subscription.id) for subscription in subscriptions)
+        station_subscriptions.thresholds = [threshold for threshold, _ in entries]
+        station_subscriptions.ids = [subscription_id for _, subscription_id in entries]
+        return station_subscriptions
+
+
+class AlertStore:
+    """Subscription store evaluated incrementally against each UV snapshot
+
+    With a path, subscriptions are persisted to that file and the last
+    evaluated readings to a state file beside it; without one everything is
+    kept in memory.
+    """
+
+    def __init__(self, path=None, sink=None):
+        self.path = path
+        self.state_path = f'{os.path.splitext(path)[0]}.state.json' if path else None
+        self.lock_path = f'{path}.lock' if path else None
+        self.sink = sink
+
+        self._subscriptions = {}
+        self._by_station = {}
+        self._dead_records = 0
+        # Position and identity of the subscription log read so far
+        self._log_offset = 0
+        self._log_inode = None
+        # Readings and fetch time of the last evaluated snapshot, when not persisted
+        self._state = None
+
+        self._evaluations = 0
+        self._alerts_sent = 0
+        self._delivery_errors = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store lock, shared with other workers through a lock file"""
+        with self._lock:
+            if self.path is None or fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(os.path.abspath(self.lock_path)), exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reset(self):
+        """Forget all subscriptions, before replaying the log from the start"""
+        self._subscriptions = {}
+        self._by_station = {}
+        self._dead_records = 0
+        self._log_offset = 0
+        self._log_inode = None
+
+    def _apply(self, record, index=True):
+        """Apply one subscription log record
+
+        With index False the station index is left for _rebuild_index().
+        """
+        if record.get('op') == 'subscribe':
+            if record['id'] in self._subscriptions:
+                return
+            subscription = Subscription(
+                record['id'],
+                record['station'],
+                record['threshold'],
+                record.get('direction', 'rising'),
+                record.get('postcode'),
+                record.get('target'),
+                record.get('created_at')
+            )
+            self._subscriptions[subscription.id] = subscription
+            if index:
+                self._by_station.setdefault(subscription.station, StationSubscriptions()).add(subscription.threshold, subscription.id)
+        elif record.get('op') == 'unsubscribe':
+            subscription = self._subscriptions.pop(record['id'], None)
+            if subscription is None:
+                return
+            # Both the subscribe and the unsubscribe record are now dead
+            self._dead_records += 2
+            if not index:
+                return
+            station_subscriptions = self._by_station[subscription.station]
+            station_subscriptions.remove(subscription.threshold, subscription.id)
+            if not station_subscriptions:
+                del self._by_station[subscription.station]
+
+    def _rebuild_index(self):
+        """Rebuild the per-station index from all subscriptions"""
+        by_station = {}
+        for subscription in self._subscriptions.values():
+            by_station.setdefault(subscription.station, []).append(subscription)
+        self._by_station = {
+            station: StationSubscriptions.from_subscriptions(subscriptions)
+            for station, subscriptions in by_station.items()
+        }
+
+    def _sync(self):
+        """Replay log records written by other workers since the last sync (lock must be held)"""
+        if self.path is None:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._log_inode is not None:
+                self._reset()
+            return
+
+        # The log was compacted by another worker, so replay it from the start
+        if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+            self._reset()
+            self._log_inode = stat.st_ino
+        if stat.st_size <= self._log_offset:
+            return
+        # A full replay indexes everything at the end instead of record by record
+        replay = self._log_offset == 0
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._log_offset)
+            chunk = f.read()
+        # Only apply complete lines; a partly written one is read next time
+        end = chunk.rfind(b'\n') + 1
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line), index=not replay)
+        self._log_offset += end
+        if replay:
+            self._rebuild_index()
+
+    def _append(self, record):
+        """Append a record to the subscription log and apply it (lock must be held)"""
+        if self.path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write((json.dumps(record, sort_keys=True) + '\n').encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                # The log was synced up to its end before writing, so skip past our own record
+                self._log_offset = f.tell()
+                self._log_inode = os.fstat(f.fileno()).st_ino
+        self._apply(record)
+
+    def _compact(self):
+        """Rewrite the subscription log with only live subscriptions (lock must be held)"""
+        if self.path is None or self._dead_records < max(COMPACT_MIN_DEAD_RECORDS, len(self._subscriptions)):
+            return
+        payload = ''.join(
+            json.dumps(dict(subscription.to_dict(), op='subscribe'), sort_keys=True) + '\n'
+            for subscription in self._subscriptions.values()
+        )
+        write_file_atomically(self.path, payload, prefix='.uv_alert_subscriptions-')
+        stat = os.stat(self.path)
+        self._log_inode = stat.st_ino
+        self._log_offset = stat.st_size
+        self._dead_records = 0
+
+    def _load_state(self):
+        """Get the readings and fetch time of the last evaluated snapshot, or None"""
+        if self.state_path is None:
+            return self._state
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error loading UV alert state from {self.state_path}: {e}")
+            return None
+
+    def _save_state(self, state):
+        if self.state_path is None:
+            self._state = state
+            return
+        write_file_atomically(self.state_path, json.dumps(state, separators=(',', ':')), prefix='.uv_alert_state-')
+
+    def subscribe(self, station, threshold, direction='rising', postcode=None, target=None):
+        """Add a subscription and return it"""
+        threshold = float(threshold)
+        if not math.isfinite(threshold):
+            raise ValueError('Invalid threshold')
+        if direction not in ALERT_DIRECTIONS:
+            raise ValueError(f"Invalid direction, expected one of: {', '.join(ALERT_DIRECTIONS)}")
+
+        subscription = Subscription(uuid.uuid4().hex, station, threshold, direction, postcode, target)
+        with self._locked():
+            self._sync()
+            self._append(dict(subscription.to_dict(), op='subscribe'))
+        return subscription
+
+    def unsubscribe(self, subscription_id):
+        """Remove a subscription, returning False if it does not exist"""
+        with self._locked():
+            self._sync()
+            if subscription_id not in self._subscriptions:
+                return False
+            self._append({'op': 'unsubscribe', 'id': subscription_id})
+            self._compact()
+        return True
+
+    def get(self, subscription_id):
+        """Get a subscription by ID, or None"""
+        with self._locked():
+            self._sync()
+            return self._subscriptions.get(subscription_id)
+
+    def _find_alerts(self, previous_readings, snapshot):
+        """Find the alerts for subscriptions crossed between the previous readings and a snapshot"""
+        alerts = []
+        for reading in snapshot.station_readings:
+            station = reading['city_id']
+            current = reading['uv_index']
+            previous = previous_readings.get(station)
+
+            # The first reading seen for a station only sets its baseline
+            station_subscriptions = self._by_station.get(station)
+            if previous is None or previous == current or not station_subscriptions:
+                continue
+
+            direction = 'rising' if current > previous else 'falling'
+            for subscription_id in station_subscriptions.crossed(previous, current):
+                subscription = self._subscriptions[subscription_id]
+                if subscription.direction not in (direction, 'both'):
+                    continue
+                alerts.append({
+                    'subscription_id': subscription.id,
+                    'station': station,
+                    'postcode': subscription.postcode,
+                    'target': subscription.target,
+                    'threshold': subscription.threshold,
+                    'direction': direction,
+                    'previous_uv_index': previous,
+                    'uv_index': current,
+                    'time': reading['time'],
+                    'date': reading['date'],
+                    'version': snapshot.version
+                })
+        return alerts
+
+    def process(self, snapshot):
+        """Find the alerts triggered by a new snapshot and deliver them to the sink
+
+        Each snapshot is compared with the last one evaluated by any worker.
+        Snapshots that are not newer are skipped, so every alert is sent
+        once. Returns the list of alerts sent.
+        """
+        with self._locked():
+            self._sync()
+            state = self._load_state()
+            if state is not None and (state['version'] == snapshot.version or state['fetched_at'] >= snapshot.fetched_at):
+                return []
+            self._evaluations += 1
+
+            alerts = self._find_alerts(state['readings'] if state else {}, snapshot)
+            if alerts and self.sink is not None:
+                try:
+                    self.sink.deliver(alerts)
+                except Exception:
+                    # Keep the old baseline, so the next snapshot retries these crossings
+                    self._delivery_errors += 1
+                    raise
+                self._alerts_sent += len(alerts)
+
+            self._save_state({
+                'version': snapshot.version,
+                'fetched_at': snapshot.fetched_at,
+                'readings': {reading['city_id']: reading['uv_index'] for reading in snapshot.station_readings}
+            })
+        return alerts
+
+    def stats(self):
+        """Get subscription and delivery counters"""
+        with self._locked():
+            self._sync()
+            state = self._load_state()
+            return {
+                'version': state['version'] if state else None,
+                'subscriptions': len(self._subscriptions),
+                'stations': len(self._by_station),
+                'evaluations': self._evaluations,
+                'alerts_sent': self._alerts_sent,
+                'delivery_errors': self._delivery_errors,
+                'sink': self.sink.name if self.sink is not None else None
+            }
+
+
+class FileSink:
+    """Appends alerts to a local file as JSON lines"""
+
+    name = 'file'
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def deliver(self, alerts):
+        lines = ''.join(json.dumps(alert, sort_keys=True) + '\n' for alert in alerts)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+
+class QueueSink:
+    """Puts alerts on an in-process queue, standing in for a message broker"""
+
+    name = 'queue'
+
+    def __init__(self, maxsize=0):
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def deliver(self, alerts):
+        for alert in alerts:
+            self.queue.put_nowait(alert)
+
+
+SINK_TYPES = {
+    'file': FileSink,
+    'queue': QueueSink
+}
+
+
+def create_sink(sink_config):
+    """Create an alert sink from a configuration dictionary"""
+    options = dict(sink_config)
+    sink_class = SINK_TYPES.get(options.pop('type', 'file'))
+    if sink_class is None:
+        raise ValueError(f"Unknown UV alert sink type: {sink_config.get('type')}")
+    return sink_class(**options)
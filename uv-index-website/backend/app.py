@@ -1,75 +1,317 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
-import requests
-import xmltodict
+from concurrent.futures import ThreadPoolExecutor
+import base64
+import itertools
+import math
 import json
+import threading
 import time
 import traceback
-from database import Database
+from locality_store import create_storage
 from models.city import City
 from config import Config
 from mock_data import MOCK_UV_DATA
-from city_mapping import CITY_MAPPING, get_all_city_info, get_city_info_by_id, get_city_info_by_short_name, find_city_info_by_name
+from interpolation import interpolate_points
+from uv_grid import build_uv_grid
+from daily_aggregates import DailyAggregates
+from circuit_breaker import CircuitBreakerOpenError
+from providers import create_providers
+from snapshot_store import save_snapshot
+from postcode_table import build_postcode_table, build_postcode_response, find_station_uv_info, get_main_city_name, serialize_response
+from station_index import parse_station_query
+from snapshot import UVSnapshot, fetch_snapshot, load_saved_snapshot
+from request_collapsing import RequestCollapser, collapse_requests
+from profiling import init_profiling, get_span_stats, record_span, span
+from admission import admission_control, create_limiters
+from alerts import AlertStore, create_sink
+from coordinate_cache import CoordinateCache, coordinate_distance, find_cell_station, find_nearest_cities, geohash_encode, parse_coordinate
+from city_mapping import CITY_MAPPING, get_all_city_info, get_city_info_by_id, find_city_info_by_name
 
 app = Flask(__name__)
 CORS(app)
+init_profiling(app)
 
 # Global variables
-db = Database()
-uv_data_cache = {
-    'data': None,
-    'timestamp': 0,
-    'raw_xml': None
+db = create_storage()
+# The current UV snapshot. Snapshots are immutable and replaced as a whole,
+# so readers just take the reference and never need a lock.
+current_snapshot = None
+mock_snapshot = None
+refresh_lock = threading.Lock()
+uv_grid_cache = {
+    'grid': None
 }
+# Only one thread builds the grid for a version; the others wait for it
+uv_grid_lock = threading.Lock()
+postcode_table_cache = {
+    'table': None
+}
+coordinate_cache = CoordinateCache(max_entries=Config.COORDINATE_CACHE_SIZE)
+daily_aggregates = DailyAggregates(Config.UV_DAILY_AGGREGATES_PATH)
+alert_store = AlertStore(Config.UV_ALERT_STORE_PATH, sink=create_sink(Config.UV_ALERT_SINK))
+admission_limiters = create_limiters(Config.ADMISSION_LIMITS)
+request_collapser = RequestCollapser()
+uv_providers = create_providers(Config.UV_DATA_SOURCES, {
+    'failure_threshold': Config.UV_BREAKER_FAILURE_THRESHOLD,
+    'base_backoff': Config.UV_BREAKER_BASE_BACKOFF,
+    'max_backoff': Config.UV_BREAKER_MAX_BACKOFF
+})
+uv_fetch_executor = ThreadPoolExecutor(max_workers=len(uv_providers), thread_name_prefix='uv-fetch')
+background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='uv-background')
 
 # Enable detailed logging
 import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def get_uv_data():
-    """Get UV data with caching"""
-    current_time = time.time()
+def fetch_uv_sources():
+    """Fetch all UV data sources concurrently and build a snapshot from their merged readings"""
+    print(f"Getting UV data from {len(uv_providers)} sources:", [provider.url for provider in uv_providers])
+    with span('upstream_fetch'):
+        # Stations of any source that fails keep their last reading, marked stale
+        snapshot, report = fetch_snapshot(
+            uv_providers,
+            uv_fetch_executor,
+            previous=current_snapshot,
+            query_cache_size=Config.UV_QUERY_CACHE_SIZE
+        )
     
-    # If cache is valid, return cached data
-    if uv_data_cache['data'] and current_time - uv_data_cache['timestamp'] < Config.UV_DATA_CACHE_TIME:
-        return uv_data_cache['data']
+    # Parsing runs on the fetch threads, so record each source's parse time here
+    for name, result in report.items():
+        if 'parse_ms' in result:
+            record_span(f'parse.{name}', result['parse_ms'])
     
+    print(f"UV data source results: {report}")
+    logger.debug(f"Merged data structure: {json.dumps(snapshot.data, indent=2)[:500]}...")
+    
+    return snapshot
+
+def publish_snapshot(snapshot):
+    """Make a snapshot current with a single reference swap"""
+    global current_snapshot
+    current_snapshot = snapshot
+
+def get_mock_snapshot():
+    """Get the snapshot of mock data used when no real data is available"""
+    global mock_snapshot
+    if mock_snapshot is None:
+        mock_snapshot = UVSnapshot(MOCK_UV_DATA, 'mock', 0, 'mock', query_cache_size=Config.UV_QUERY_CACHE_SIZE)
+    return mock_snapshot
+
+def refresh_snapshot():
+    """Fetch new UV data from the upstream sources and publish it as a snapshot"""
     try:
-        # Get XML data
-        print("Getting UV data from:", Config.UV_DATA_URL)
-        response = requests.get(Config.UV_DATA_URL)
-        response.raise_for_status()
-        
-        # Save raw XML content
-        xml_content = response.text
-        
-        # Log first 500 characters of XML content for debugging
-        logger.debug(f"XML response content (first 500 chars): {xml_content[:500]}...")
-        
-        # Convert XML to Python dictionary
-        data = xmltodict.parse(xml_content)
-        
-        print("Successfully parsed XML data")
-        logger.debug(f"Parsed data structure: {json.dumps(data, indent=2)[:500]}...")
-        
-        # Update cache
-        uv_data_cache['data'] = data
-        uv_data_cache['timestamp'] = current_time
-        uv_data_cache['raw_xml'] = xml_content
-        
-        return data
+        # Each source's breaker skips it immediately while that source is failing
+        snapshot = fetch_uv_sources()
+    except CircuitBreakerOpenError as e:
+        print(f"Skipping UV data fetch: {e}")
+        return None
     except Exception as e:
         print(f"Error getting UV data: {e}")
         logger.error(f"Error getting UV data: {traceback.format_exc()}")
+        return None
+    
+    publish_snapshot(snapshot)
+    
+    # Persist the snapshot so a restarted worker can serve it immediately
+    try:
+        save_snapshot(Config.UV_SNAPSHOT_PATH, snapshot.data, snapshot.version, snapshot.fetched_at)
+    except Exception as e:
+        print(f"Error saving UV snapshot: {e}")
+    
+    # Fold the new readings into the daily peak and exposure aggregates
+    try:
+        new_readings = daily_aggregates.ingest(snapshot.data)
+        print(f"Updated daily aggregates with {new_readings} new readings")
+    except Exception as e:
+        print(f"Error updating daily aggregates: {e}")
+    
+    # Rasterize the new snapshot once for the map heat layer
+    try:
+        get_uv_grid(snapshot)
+    except Exception as e:
+        print(f"Error building UV grid: {e}")
+    
+    # Rebuild the postcode responses and send threshold alerts in the background
+    background_executor.submit(rebuild_postcode_table, snapshot)
+    background_executor.submit(process_alerts, snapshot)
+    
+    return snapshot
+
+def get_snapshot():
+    """Get the current UV snapshot, refreshing it when it has expired"""
+    snapshot = current_snapshot
+    if snapshot is not None and snapshot.age() < Config.UV_DATA_CACHE_TIME:
+        return snapshot
+    
+    # One thread refreshes while the others keep serving the expired snapshot;
+    # only a cold start with no snapshot at all waits for the refresh
+    if refresh_lock.acquire(blocking=snapshot is None):
+        try:
+            latest = current_snapshot
+            if latest is not None and latest.age() < Config.UV_DATA_CACHE_TIME:
+                return latest
+            refreshed = refresh_snapshot()
+            if refreshed is not None:
+                return refreshed
+        finally:
+            refresh_lock.release()
+    
+    # If a snapshot exists, return the expired one
+    snapshot = current_snapshot
+    if snapshot is not None:
+        return snapshot
+    
+    # If no snapshot, use mock data
+    print("Using mock UV data...")
+    return get_mock_snapshot()
+
+def get_request_snapshot():
+    """Get the UV snapshot pinned to the current request
+
+    Every read within one request sees the same snapshot, even if a new one
+    is published while the request is running.
+    """
+    if not has_request_context():
+        return get_snapshot()
+    if 'uv_snapshot' not in g:
+        g.uv_snapshot = get_snapshot()
+    return g.uv_snapshot
+
+def serve_cached_uv_index(view):
+    """Serve /api/uv-index from the current snapshot's response cache only"""
+    snapshot = current_snapshot
+    if snapshot is None:
+        return None
+    try:
+        query = parse_station_query(request.args)
+    except ValueError:
+        return None
+    payload = snapshot.station_index.get_cached(**query)
+    if payload is None:
+        return None
+    return Response(payload, mimetype='application/json')
+
+def serve_cached_coordinates(view):
+    """Serve a nearest-station lookup from the coordinate cache only
+
+    Interpolation is never served degraded, since it always has to be computed.
+    """
+    snapshot = current_snapshot
+    if snapshot is None or request.args.get('mode', 'nearest') == 'idw':
+        return None
+    try:
+        latitude, longitude = parse_coordinate(request.args.get('lat'), request.args.get('lng'))
+    except (TypeError, ValueError):
+        return None
+    
+    cell = geohash_encode(latitude, longitude, Config.COORDINATE_CACHE_PRECISION)
+    answer = coordinate_cache.get(snapshot.version, cell)
+    if answer is None or answer['city'] is None or not answer['uv_info']:
+        return None
+    return jsonify(dict(answer['uv_info'], distance=coordinate_distance(latitude, longitude, answer['city'])))
+
+def serve_cached_grid(view):
+    """Serve the grid metadata only if the current snapshot's grid is already built"""
+    snapshot = current_snapshot
+    grid = uv_grid_cache['grid']
+    if snapshot is None or grid is None or grid.version != snapshot.version:
+        return None
+    return grid_metadata_response(grid)
+
+def serve_cached_postcode(view, postcode):
+    """Serve a postcode from the materialized table only, skipping the database"""
+    snapshot = current_snapshot
+    table = postcode_table_cache['table']
+    if snapshot is None or table is None or table.version != snapshot.version:
+        return None
+    payload = table.get(postcode)
+    if payload is None:
+        return None
+    return Response(payload, mimetype='application/json')
+
+def get_uv_data():
+    """Get UV data with caching"""
+    return get_request_snapshot().data
+
+def load_persisted_snapshot():
+    """Publish the snapshot saved by the last successful fetch"""
+    # An old snapshot counts as expired and is only served while the upstream
+    # cannot be reached
+    snapshot = load_saved_snapshot(Config.UV_SNAPSHOT_PATH, query_cache_size=Config.UV_QUERY_CACHE_SIZE)
+    if snapshot is None:
+        return False
+    publish_snapshot(snapshot)
+    
+    age = snapshot.age()
+    print(f"Loaded UV snapshot {snapshot.version} ({age:.0f}s old{', stale' if age >= Config.UV_DATA_CACHE_TIME else ''})")
+    
+    try:
+        daily_aggregates.ingest(snapshot.data)
+    except Exception as e:
+        print(f"Error updating daily aggregates: {e}")
+    
+    background_executor.submit(prebuild_uv_grid, snapshot)
+    background_executor.submit(rebuild_postcode_table, snapshot)
+    # Skipped unless this snapshot is newer than the last one evaluated
+    background_executor.submit(process_alerts, snapshot)
+    return True
+
+def rebuild_postcode_table(snapshot):
+    """Build the postcode response table for a snapshot and swap it in"""
+    try:
+        started = time.time()
+        table = build_postcode_table(db.get_all_cities(), snapshot.locations_by_id, snapshot.version)
         
-        # If cache exists, return expired cache
-        if uv_data_cache['data']:
-            return uv_data_cache['data']
-            
-        # If no cache, use mock data
-        print("Using mock UV data...")
-        return MOCK_UV_DATA
+        # Don't replace a table built from a newer snapshot
+        if current_snapshot is snapshot:
+            postcode_table_cache['table'] = table
+        print(f"Built postcode table for version {snapshot.version} with {len(table.responses)} postcodes in {time.time() - started:.2f}s")
+    except Exception as e:
+        print(f"Error building postcode table: {e}")
+        logger.error(f"Error building postcode table: {traceback.format_exc()}")
+
+def process_alerts(snapshot):
+    """Send the threshold alerts triggered by a new snapshot"""
+    try:
+        alerts = alert_store.process(snapshot)
+        if alerts:
+            print(f"Sent {len(alerts)} UV alerts for version {snapshot.version}")
+    except Exception as e:
+        print(f"Error sending UV alerts: {e}")
+        logger.error(f"Error sending UV alerts: {traceback.format_exc()}")
+
+def get_uv_grid(snapshot):
+    """Get the UV raster grid for a snapshot, building it once per version"""
+    grid = uv_grid_cache['grid']
+    if grid is not None and grid.version == snapshot.version:
+        return grid
+    
+    with uv_grid_lock:
+        # Another thread may have built it while we waited for the lock
+        grid = uv_grid_cache['grid']
+        if grid is not None and grid.version == snapshot.version:
+            return grid
+        
+        print(f"Building UV grid for data version {snapshot.version}")
+        grid = build_uv_grid(
+            snapshot.station_readings,
+            snapshot.version,
+            Config.UV_GRID_BOUNDS,
+            Config.UV_GRID_RESOLUTION,
+            k=Config.UV_INTERPOLATION_K,
+            power=Config.UV_INTERPOLATION_POWER
+        )
+        uv_grid_cache['grid'] = grid
+        return grid
+
+def prebuild_uv_grid(snapshot):
+    """Build the UV grid for a snapshot ahead of the first request for it"""
+    try:
+        get_uv_grid(snapshot)
+    except Exception as e:
+        print(f"Error building UV grid: {e}")
 
 def find_city_uv_index(city_name):
     """Find UV index for a specific city in UV data"""
@@ -174,16 +416,75 @@ def find_city_uv_index(city_name):
         print(f"Error finding city UV index: {e}")
         return None
 
+def encode_cities_cursor(row):
+    """Encode the keyset position after a city row as an opaque cursor token"""
+    key = json.dumps([row['name'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_cities_cursor(token):
+    """Decode a cursor token into (name, id)"""
+    name, city_id = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+    return str(name), int(city_id)
+
+def stream_cities(rows, first_row, ndjson):
+    """Stream all cities as NDJSON lines or as one JSON array
+
+    first_row has already been taken from rows, so a failure to reach the
+    database is reported before the response starts.
+    """
+    try:
+        if not ndjson:
+            yield '['
+        if first_row is not None:
+            for number, row in enumerate(itertools.chain([first_row], rows)):
+                line = json.dumps(City.from_db_row(row).to_dict(), separators=(',', ':'))
+                if ndjson:
+                    yield line + '\n'
+                else:
+                    yield line if number == 0 else ',' + line
+        if not ndjson:
+            yield ']'
+    finally:
+        # Release the cursor's connection even if the client disconnects early
+        rows.close()
+
 @app.route('/api/cities', methods=['GET'])
+@admission_control(admission_limiters['cities'])
 def get_cities():
-    """Get all cities"""
+    """Get all cities, paginated with ?limit=&cursor= or streamed with ?format=ndjson"""
     try:
-        cities = db.get_all_cities()
-        return jsonify([City.from_db_row(city).to_dict() for city in cities])
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = int(request.args.get('limit', Config.CITIES_PAGE_DEFAULT_LIMIT))
+                after_name, after_id = decode_cities_cursor(request.args['cursor']) if request.args.get('cursor') else ('', 0)
+            except (TypeError, ValueError):
+                return jsonify({'error': 'Invalid limit or cursor'}), 400
+            limit = max(1, min(limit, Config.CITIES_PAGE_MAX_LIMIT))
+            
+            with span('db_query'):
+                cities = db.get_cities_page(after_name, after_id, limit)
+            with span('serialization'):
+                return jsonify({
+                    'cities': [City.from_db_row(city).to_dict() for city in cities],
+                    'next_cursor': encode_cities_cursor(cities[-1]) if len(cities) == limit else None
+                })
+        
+        # Stream the whole table from a server-side cursor rather than building it in memory
+        ndjson = request.args.get('format') == 'ndjson'
+        rows = db.iter_all_cities(Config.CITIES_STREAM_BATCH_SIZE)
+        with span('db_query'):
+            first_row = next(rows, None)
+        return Response(
+            stream_with_context(stream_cities(rows, first_row, ndjson)),
+            mimetype='application/x-ndjson' if ndjson else 'application/json'
+        )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/cities/search', methods=['GET'])
+# Search is case-insensitive, so differently-cased prefixes share one query
+@collapse_requests(request_collapser, key_func=lambda: request.args.get('name', '').lower(), limiter=admission_limiters['search'])
+@admission_control(admission_limiters['search'])
 def search_cities():
     """Search cities"""
     name = request.args.get('name', '')
@@ -191,244 +492,336 @@ def search_cities():
         return jsonify([])
     
     try:
-        cities = db.find_cities_by_name(name)
-        return jsonify([City.from_db_row(city).to_dict() for city in cities])
+        with span('db_query'):
+            cities = db.find_cities_by_name(name)
+        with span('serialization'):
+            return jsonify([City.from_db_row(city).to_dict() for city in cities])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/uv-index', methods=['GET'])
+@admission_control(admission_limiters['uv_index'], degraded=serve_cached_uv_index)
 def get_uv_index():
-    """Get UV index data"""
+    """Get UV index data, optionally filtered and trimmed to selected fields"""
     try:
-        uv_data = get_uv_data()
-        if not uv_data:
-            return jsonify({'error': 'Unable to get UV data'}), 500
-        
-        # Extract UV index for all locations
-        locations = uv_data.get('stations', {}).get('location', [])
-        if not isinstance(locations, list):
-            locations = [locations]
-        
-        print(f"Found {len(locations)} location records")
-        
-        result = []
-        for location in locations:
-            try:
-                # Get city ID and short name
-                city_id = location.get('@id', '')
-                short_name = location.get('name', '')
-                
-                # Get city info from mapping
-                city_info = get_city_info_by_id(city_id)
-                
-                if not city_info:
-                    print(f"City ID '{city_id}' has no mapping, trying to find by short name...")
-                    # Try to find by short name
-                    if short_name:
-                        city_info = get_city_info_by_short_name(short_name)
-                    
-                    # If still not found, create basic info
-                    if not city_info:
-                        print(f"Cannot find city info, using basic info: {city_id}, {short_name}")
-                        city_info = {
-                            "id": city_id,
-                            "name": city_id or "Unknown City",
-                            "short_name": short_name,
-                            "state": "Unknown",
-                            "latitude": 0,
-                            "longitude": 0
-                        }
-                
-                # Get UV index value
-                uv_value = 0
-                try:
-                    uv_value = float(location.get('index', 0))
-                except (ValueError, TypeError) as e:
-                    print(f"Error parsing UV index value: {e}")
-                    continue
-                
-                # Get time, date and status
-                time_value = location.get('time', '')
-                date_value = location.get('date', '')
-                status_value = location.get('status', '')
-                
-                # Skip if status is not OK (optional)
-                if status_value and status_value.lower() != 'ok':
-                    print(f"City {city_id} status is not OK: {status_value}")
-                    # You can choose to skip or continue based on requirements
-                    # continue
-                
-                # Add to result list
-                result.append({
-                    'city': city_info['name'],
-                    'city_id': city_id,
-                    'short_name': short_name,
-                    'state': city_info['state'],
-                    'uv_index': uv_value,
-                    'time': time_value,
-                    'date': date_value,
-                    'latitude': city_info['latitude'],
-                    'longitude': city_info['longitude'],
-                    'status': status_value
-                })
-            except Exception as e:
-                # Skip data with unexpected format
-                print(f"Error processing location: {e}, data: {location}")
-                continue
-        
-        print(f"Successfully processed {len(result)} location data")
-        return jsonify(result)
+        try:
+            query = parse_station_query(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        index = get_request_snapshot().station_index
+        
+        # Responses are cached per snapshot and parameter combination
+        payload = index.get_cached(**query)
+        if payload is None:
+            with span('station_lookup'):
+                readings = index.select(**query)
+            with span('serialization'):
+                payload = index.store(serialize_response(readings), **query)
+        return Response(payload, mimetype='application/json')
     except Exception as e:
         print(f"Error getting UV index: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/uv-index/postcode/<postcode>', methods=['GET'])
+@collapse_requests(request_collapser, limiter=admission_limiters['postcode'])
+@admission_control(admission_limiters['postcode'], degraded=serve_cached_postcode)
 def get_uv_index_by_postcode(postcode):
     """Get UV index by postcode"""
     try:
-        city = db.get_city_by_postcode(postcode)
+        # Pin one snapshot for the whole request
+        snapshot = get_request_snapshot()
+        
+        # Serve the materialized response when the table matches this snapshot
+        table = postcode_table_cache['table']
+        if table is not None and table.version == snapshot.version:
+            payload = table.get(postcode)
+            if payload is not None:
+                return Response(payload, mimetype='application/json')
+        
+        with span('db_query'):
+            city = db.get_city_by_postcode(postcode)
         if not city:
             return jsonify({'error': f'No city found for postcode {postcode}'}), 404
         
         city_obj = City.from_db_row(city)
-        
-        # Query real-time UV data
-        uv_data = get_uv_data()
-        if not uv_data:
-            return jsonify({'error': 'Unable to get UV data'}), 500
-        
-        # Get city name - handle Melbourne and Sydney suburbs
-        city_name = city_obj.name
-        main_city = city_name
-        
-        # If city name contains Melbourne or Sydney suburbs, use main city name
-        if "Melbourne" in city_name or city_obj.state == "VIC" and city_obj.postcode.startswith("3"):
-            main_city = "Melbourne"
-        elif "Sydney" in city_name or city_obj.state == "NSW" and city_obj.postcode.startswith("20"):
-            main_city = "Sydney"
-        
-        # Find UV index
-        locations = uv_data.get('stations', {}).get('location', [])
-        if not isinstance(locations, list):
-            locations = [locations]
-        
-        # Try to find by city ID
-        uv_info = None
-        for location in locations:
-            if location.get('@id', '') == main_city:
-                # Get city info
-                city_info = get_city_info_by_id(main_city)
-                if not city_info:
-                    continue
-                
-                try:
-                    uv_value = float(location.get('index', 0))
-                except (ValueError, TypeError):
-                    continue
-                
-                uv_info = {
-                    'city': city_info['name'],
-                    'city_id': main_city,
-                    'state': city_info['state'],
-                    'uv_index': uv_value,
-                    'time': location.get('time', ''),
-                    'date': location.get('date', ''),
-                    'latitude': city_info['latitude'],
-                    'longitude': city_info['longitude']
-                }
-                break
-        
-        if not uv_info:
-            return jsonify({
-                'city': city_obj.to_dict(),
-                'uv_index': None,
-                'message': f'No UV index data found for {main_city}'
-            })
-        
-        return jsonify({
-            'city': city_obj.to_dict(),
-            'uv_index': uv_info,
-            'original_query': {
-                'postcode': postcode
-            }
-        })
+        with span('station_lookup'):
+            response = build_postcode_response(city_obj, snapshot.locations_by_id, postcode)
+        with span('serialization'):
+            return jsonify(response)
     except Exception as e:
         print(f"Error getting UV index by postcode: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/uv-index/coordinates', methods=['GET'])
+@admission_control(admission_limiters['coordinates'], degraded=serve_cached_coordinates)
 def get_uv_index_by_coordinates():
     """Get UV index for nearest city by coordinates"""
     try:
         try:
-            latitude = float(request.args.get('lat'))
-            longitude = float(request.args.get('lng'))
-        except:
+            latitude, longitude = parse_coordinate(request.args.get('lat'), request.args.get('lng'))
+        except (TypeError, ValueError):
             return jsonify({'error': 'Invalid coordinates'}), 400
         
-        # Get real-time UV data
-        uv_data = get_uv_data()
-        if not uv_data:
-            return jsonify({'error': 'Unable to get UV data'}), 500
-        
-        # Get all city info
-        all_cities = get_all_city_info()
+        # Pin one snapshot for the whole request
+        snapshot = get_request_snapshot()
         
-        # Find nearest city
-        closest_city = None
-        min_distance = float('inf')
-        
-        for city_info in all_cities:
+        # Interpolate between the nearest stations instead of taking the closest one
+        if request.args.get('mode', 'nearest') == 'idw':
             try:
-                city_lat = city_info['latitude']
-                city_lng = city_info['longitude']
-                
-                # Calculate simple Euclidean distance (not exact Earth distance, but sufficient to find nearest station)
-                distance = ((latitude - city_lat) ** 2 + (longitude - city_lng) ** 2) ** 0.5
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_city = city_info
-            except:
-                continue
-        
-        if not closest_city:
-            return jsonify({'error': 'No nearby city found'}), 404
-        
-        # Find corresponding UV index data
-        locations = uv_data.get('stations', {}).get('location', [])
-        if not isinstance(locations, list):
-            locations = [locations]
-        
-        uv_info = None
-        for location in locations:
-            if location.get('@id', '') == closest_city['id']:
-                try:
-                    uv_value = float(location.get('index', 0))
-                except (ValueError, TypeError):
-                    continue
-                
-                uv_info = {
-                    'city': closest_city['name'],
-                    'city_id': closest_city['id'],
-                    'state': closest_city['state'],
-                    'uv_index': uv_value,
-                    'time': location.get('time', ''),
-                    'date': location.get('date', ''),
-                    'latitude': closest_city['latitude'],
-                    'longitude': closest_city['longitude'],
-                    'distance': min_distance
+                k = int(request.args.get('k', Config.UV_INTERPOLATION_K))
+            except ValueError:
+                return jsonify({'error': 'Invalid k'}), 400
+            
+            with span('station_lookup'):
+                results = interpolate_points(
+                    snapshot.station_readings,
+                    [(latitude, longitude)],
+                    k=k,
+                    power=Config.UV_INTERPOLATION_POWER
+                )
+            result = results[0]
+            result['mode'] = 'idw'
+            with span('serialization'):
+                return jsonify(result)
+        
+        with span('station_lookup'):
+            # Nearby fixes share a geohash cell, so look up the cell's answer first
+            version = snapshot.version
+            cell = geohash_encode(latitude, longitude, Config.COORDINATE_CACHE_PRECISION)
+            answer = coordinate_cache.get(version, cell)
+            if answer is None:
+                closest_city = find_cell_station(cell, get_all_city_info())
+                answer = {
+                    'city': closest_city,
+                    'uv_info': find_station_uv_info(snapshot.locations_by_id, closest_city['id']) if closest_city else None
                 }
-                break
+                coordinate_cache.put(version, cell, answer)
+            
+            closest_city = answer['city']
+            uv_info = answer['uv_info']
+            
+            # The cell straddles a boundary between stations, so resolve this exact point
+            if closest_city is None:
+                closest_city = find_nearest_cities(latitude, longitude, get_all_city_info())[0]
+                if not closest_city:
+                    return jsonify({'error': 'No nearby city found'}), 404
+                uv_info = find_station_uv_info(snapshot.locations_by_id, closest_city['id'])
         
         if not uv_info:
             return jsonify({'error': f'No UV index data found for {closest_city["name"]}'}), 404
         
-        return jsonify(uv_info)
+        # Distance is to the exact point, so it is added to a copy of the cached answer
+        uv_info = dict(uv_info, distance=coordinate_distance(latitude, longitude, closest_city))
+        with span('serialization'):
+            return jsonify(uv_info)
     except Exception as e:
         print(f"Error getting UV index by coordinates: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/uv-index/coordinates/batch', methods=['POST'])
+@admission_control(admission_limiters['coordinates_batch'])
+def get_uv_index_by_coordinates_batch():
+    """Get interpolated UV index for a batch of coordinates"""
+    try:
+        payload = request.get_json(silent=True)
+        if payload is None:
+            payload = {}
+        if not isinstance(payload, dict):
+            return jsonify({'error': 'Expected a JSON object with a points list'}), 400
+        points = payload.get('points', [])
+        if not isinstance(points, list):
+            return jsonify({'error': 'Invalid coordinates'}), 400
+        
+        try:
+            # NaN or infinite points would make the response invalid JSON
+            points = [
+                parse_coordinate(point['lat'], point['lng']) if isinstance(point, dict)
+                else parse_coordinate(point[0], point[1])
+                for point in points
+            ]
+            k = int(payload.get('k', Config.UV_INTERPOLATION_K))
+        except (KeyError, IndexError, TypeError, ValueError):
+            return jsonify({'error': 'Invalid coordinates'}), 400
+        
+        if len(points) > Config.UV_INTERPOLATION_MAX_POINTS:
+            return jsonify({'error': f'Too many points, maximum is {Config.UV_INTERPOLATION_MAX_POINTS}'}), 400
+        
+        snapshot = get_request_snapshot()
+        
+        with span('station_lookup'):
+            results = interpolate_points(
+                snapshot.station_readings,
+                points,
+                k=k,
+                power=Config.UV_INTERPOLATION_POWER
+            )
+        with span('serialization'):
+            return jsonify({'mode': 'idw', 'results': results})
+    except Exception as e:
+        print(f"Error interpolating UV index for coordinates: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/status/upstream', methods=['GET'])
+def get_upstream_status():
+    """Get upstream circuit breaker state for monitoring"""
+    stats = {
+        'sources': [dict(provider.breaker.stats(), url=provider.url) for provider in uv_providers]
+    }
+    snapshot = current_snapshot
+    if snapshot is not None:
+        cache_age = snapshot.age()
+        stats['cache_age_seconds'] = round(cache_age, 1)
+        stats['cache_stale'] = cache_age >= Config.UV_DATA_CACHE_TIME
+        stats['cache_source'] = snapshot.source
+        stats['cache_version'] = snapshot.version
+    else:
+        stats['cache_age_seconds'] = None
+    return jsonify(stats)
+
+@app.route('/api/status/coordinate-cache', methods=['GET'])
+def get_coordinate_cache_status():
+    """Get coordinate result cache counters and hit rate"""
+    stats = coordinate_cache.stats()
+    stats['precision'] = Config.COORDINATE_CACHE_PRECISION
+    return jsonify(stats)
+
+@app.route('/api/status/admission', methods=['GET'])
+def get_admission_status():
+    """Get admission control state and counters per route"""
+    return jsonify({name: limiter.stats() for name, limiter in admission_limiters.items()})
+
+@app.route('/api/status/request-collapsing', methods=['GET'])
+def get_request_collapsing_status():
+    """Get in-flight request collapsing counters"""
+    return jsonify(request_collapser.stats())
+
+@app.route('/api/status/profiling', methods=['GET'])
+def get_profiling_status():
+    """Get aggregated timing spans across requests"""
+    return jsonify({
+        'enabled': Config.PROFILING_ENABLED,
+        'sample_rate': Config.PROFILE_SAMPLE_RATE,
+        'spans': get_span_stats()
+    })
+
+@app.route('/api/uv-index/daily', methods=['GET'])
+def get_daily_uv_aggregates():
+    """Get daily peak UV and exposure for all stations, for each station's current local day"""
+    return jsonify(daily_aggregates.get_all())
+
+@app.route('/api/uv-index/daily/<city_id>', methods=['GET'])
+def get_daily_uv_aggregate(city_id):
+    """Get daily peak UV and exposure for one station's current local day"""
+    aggregate = daily_aggregates.get(city_id)
+    if not aggregate:
+        return jsonify({'error': f'No daily UV data found for {city_id} today'}), 404
+    return jsonify(aggregate)
+
+@app.route('/api/alerts/subscriptions', methods=['POST'])
+def create_alert_subscription():
+    """Subscribe to UV threshold alerts for a postcode or station"""
+    try:
+        payload = request.get_json(silent=True) or {}
+        postcode = payload.get('postcode')
+        station = payload.get('station')
+        
+        try:
+            threshold = float(payload['threshold'])
+        except (KeyError, TypeError, ValueError):
+            return jsonify({'error': 'Invalid threshold'}), 400
+        if not math.isfinite(threshold):
+            return jsonify({'error': 'Invalid threshold'}), 400
+        
+        # Postcode subscriptions are resolved to their UV station once, here
+        if postcode:
+            city = db.get_city_by_postcode(str(postcode))
+            if not city:
+                return jsonify({'error': f'No city found for postcode {postcode}'}), 404
+            station = get_main_city_name(City.from_db_row(city))
+        elif not station:
+            return jsonify({'error': 'A postcode or station is required'}), 400
+        
+        if not get_city_info_by_id(station):
+            return jsonify({'error': f'No UV station found for {station}'}), 404
+        
+        try:
+            subscription = alert_store.subscribe(
+                station,
+                threshold,
+                direction=payload.get('direction', 'rising'),
+                postcode=postcode,
+                target=payload.get('target')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(subscription.to_dict()), 201
+    except Exception as e:
+        print(f"Error creating alert subscription: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/alerts/subscriptions/<subscription_id>', methods=['GET'])
+def get_alert_subscription(subscription_id):
+    """Get a UV threshold alert subscription"""
+    subscription = alert_store.get(subscription_id)
+    if subscription is None:
+        return jsonify({'error': f'No subscription found for {subscription_id}'}), 404
+    return jsonify(subscription.to_dict())
+
+@app.route('/api/alerts/subscriptions/<subscription_id>', methods=['DELETE'])
+def delete_alert_subscription(subscription_id):
+    """Unsubscribe from UV threshold alerts"""
+    if not alert_store.unsubscribe(subscription_id):
+        return jsonify({'error': f'No subscription found for {subscription_id}'}), 404
+    return jsonify({'deleted': subscription_id})
+
+@app.route('/api/status/alerts', methods=['GET'])
+def get_alerts_status():
+    """Get UV alert subscription and delivery counters"""
+    return jsonify(alert_store.stats())
+
+def grid_metadata_response(grid):
+    """Build the metadata response for a UV raster grid"""
+    metadata = grid.metadata()
+    metadata['url'] = f'/api/uv-index/grid/{grid.version}.bin'
+    
+    response = jsonify(metadata)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/uv-index/grid', methods=['GET'])
+@admission_control(admission_limiters['grid'], degraded=serve_cached_grid)
+def get_uv_index_grid():
+    """Get metadata for the current UV raster grid"""
+    try:
+        snapshot = get_request_snapshot()
+        
+        return grid_metadata_response(get_uv_grid(snapshot))
+    except Exception as e:
+        print(f"Error getting UV grid: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/uv-index/grid/<version>.bin', methods=['GET'])
+def get_uv_index_grid_data(version):
+    """Get the binary UV raster grid for a data version"""
+    grid = uv_grid_cache['grid']
+    if grid is None or grid.version != version:
+        return jsonify({'error': f'No UV grid found for version {version}'}), 404
+    
+    # Grid contents never change for a version, so clients may cache it indefinitely
+    response = Response(grid.payload, mimetype='application/octet-stream')
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    response.headers['ETag'] = f'"{grid.version}"'
+    response.headers['X-Grid-Rows'] = str(grid.rows)
+    response.headers['X-Grid-Cols'] = str(grid.cols)
+    return response
+
+# Warm the cache from disk so the first requests after a restart don't wait on upstream
+try:
+    load_persisted_snapshot()
+except Exception as e:
+    print(f"Failed to load UV snapshot: {e}")
+
 if __name__ == '__main__':
     # Preload data at startup to check XML structure
     try:
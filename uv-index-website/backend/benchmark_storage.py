@@ -0,0 +1,167 @@
+"""
+Storage benchmark for UV index website.
+Times the city lookups used by the API against Postgres and the locality
+store, reporting throughput and latency percentiles for each backend.
+
+Usage:
+    python benchmark_storage.py --iterations 5000
+    python benchmark_storage.py --backend locality --threads 8
+    python benchmark_storage.py --backend locality --threads 8 --server
+"""
+
+import argparse
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from config import Config
+from locality_store import LocalityStore
+
+
+def percentile(sorted_values, fraction):
+    """Get a percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_workload(name, operation, arguments, threads):
+    """Time operation over every argument and print throughput and latency"""
+    def timed(argument):
+        started = time.perf_counter()
+        operation(argument)
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(timed, arguments))
+    else:
+        latencies = [timed(argument) for argument in arguments]
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"  {name:<22} {len(arguments) / elapsed:>10.0f} ops/sec"
+        f"  p50 {percentile(latencies, 0.5):.3f} ms"
+        f"  p99 {percentile(latencies, 0.99):.3f} ms"
+    )
+
+
+def open_file_descriptors():
+    """Count this process's open file descriptors, or None if /proc is unavailable"""
+    if not os.path.isdir('/proc/self/fd'):
+        return None
+    return len(os.listdir('/proc/self/fd'))
+
+
+def start_server(storage):
+    """Serve the lookups over HTTP from a werkzeug server with a thread per request
+
+    This is how the development server runs the app, so every lookup comes
+    from a new thread rather than from a fixed set of worker threads.
+    """
+    from flask import Flask, jsonify
+    from werkzeug.serving import make_server
+
+    app = Flask('benchmark_storage')
+
+    @app.route('/postcode/<postcode>')
+    def postcode_lookup(postcode):
+        return jsonify(storage.get_city_by_postcode(postcode))
+
+    @app.route('/search/<name>')
+    def name_search(name):
+        return jsonify(storage.find_cities_by_name(name))
+
+    @app.route('/cities')
+    def all_cities():
+        return jsonify(storage.get_all_cities())
+
+    # Keep the per-request access log out of the results
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark(label, storage, postcodes, names, iterations, threads, server=False):
+    """Run every workload against one storage backend, directly or through a threaded server"""
+    print(f"{label}:")
+    if not server:
+        run_workload('get_city_by_postcode', storage.get_city_by_postcode, postcodes, threads)
+        run_workload('find_cities_by_name', storage.find_cities_by_name, names, threads)
+        run_workload('get_all_cities', lambda _: storage.get_all_cities(), range(max(1, iterations // 100)), threads)
+        return
+
+    import requests
+
+    http = start_server(storage)
+    base_url = f"http://127.0.0.1:{http.server_port}"
+    try:
+        def fetch(path):
+            response = requests.get(base_url + path)
+            response.raise_for_status()
+
+        fds_before = open_file_descriptors()
+        run_workload('GET /postcode', lambda postcode: fetch(f"/postcode/{quote(postcode)}"), postcodes, threads)
+        run_workload('GET /search', lambda name: fetch(f"/search/{quote(name)}"), names, threads)
+        run_workload('GET /cities', lambda _: fetch('/cities'), range(max(1, iterations // 100)), threads)
+        fds_after = open_file_descriptors()
+        if fds_before is not None:
+            print(f"  open file descriptors   {fds_before} before, {fds_after} after")
+    finally:
+        http.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare city lookups on Postgres and the locality store')
+    parser.add_argument('--backend', choices=['all', 'postgres', 'locality'], default='all', help='Backends to benchmark')
+    parser.add_argument('--store', default=Config.LOCALITY_STORE_PATH, help='Locality store file')
+    parser.add_argument('--iterations', type=int, default=2000, help='Lookups per workload')
+    parser.add_argument('--threads', type=int, default=1, help='Concurrent lookups')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the lookup keys')
+    parser.add_argument('--server', action='store_true', help='Query through an HTTP server that starts a thread per request')
+    args = parser.parse_args()
+
+    backends = []
+    if args.backend in ('all', 'locality'):
+        backends.append(('locality', lambda: LocalityStore(args.store)))
+    if args.backend in ('all', 'postgres'):
+        from database import Database
+        backends.append(('postgres', Database))
+
+    storages = []
+    for label, factory in backends:
+        try:
+            storages.append((label, factory()))
+        except Exception as e:
+            print(f"Skipping {label}: {e}")
+    if not storages:
+        return
+
+    # Both backends are queried with the same keys, drawn from the real rows
+    rows = storages[0][1].get_all_cities()
+    if not rows:
+        print("No cities to benchmark")
+        return
+    rng = random.Random(args.seed)
+    postcodes = [rng.choice(rows)['postcode'] for _ in range(args.iterations)]
+    names = [rng.choice(rows)['name'][:3] for _ in range(args.iterations)]
+
+    mode = 'through a thread-per-request server' if args.server else 'direct'
+    print(f"{len(rows)} cities, {args.iterations} lookups per workload, {args.threads} threads, {mode}")
+    for label, storage in storages:
+        try:
+            benchmark(label, storage, postcodes, names, args.iterations, args.threads, args.server)
+        finally:
+            storage.close()
+
+
+if __name__ == '__main__':
+    main()
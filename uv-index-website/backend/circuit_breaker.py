@@ -0,0 +1,123 @@
+"""
+Circuit breaker module for UV index website.
+Stops calling a failing upstream for a backoff period, so failures are
+answered immediately from fallback data instead of adding latency to
+every request.
+"""
+
+import random
+import threading
+import time
+
+
+class CircuitBreakerOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, base_backoff=5.0, max_backoff=600.0, jitter=0.5):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._consecutive_opens = 0
+        self._retry_at = 0.0
+        self._probe_in_flight = False
+        self._last_error = None
+        self._transitions = {}
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        return self._state
+
+    def _transition(self, new_state):
+        """Move to a new state and count the transition (lock must be held)"""
+        key = f'{self._state}->{new_state}'
+        self._transitions[key] = self._transitions.get(key, 0) + 1
+        self._state = new_state
+
+    def _backoff(self):
+        """Exponential backoff with jitter for the current number of opens"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (self._consecutive_opens - 1)))
+        return delay * random.uniform(1 - self.jitter, 1)
+
+    def allow_request(self):
+        """Check whether a call may go to the upstream now
+
+        While open, calls are rejected until the backoff expires; then a
+        single probe call is let through in the half-open state.
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN and time.time() >= self._retry_at:
+                self._transition(self.HALF_OPEN)
+                self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+
+            self._rejected += 1
+            return False
+
+    def record_success(self):
+        """Record a successful upstream call"""
+        with self._lock:
+            self._consecutive_failures = 0
+            self._consecutive_opens = 0
+            self._probe_in_flight = False
+            if self._state != self.CLOSED:
+                self._transition(self.CLOSED)
+
+    def record_failure(self, error=None):
+        """Record a failed upstream call, opening the circuit if needed"""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            self._last_error = str(error) if error else None
+
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._consecutive_opens += 1
+                self._retry_at = time.time() + self._backoff()
+                if self._state != self.OPEN:
+                    self._transition(self.OPEN)
+
+    def call(self, func, *args, **kwargs):
+        """Call func through the breaker"""
+        if not self.allow_request():
+            raise CircuitBreakerOpenError(f'Circuit {self.name} is open')
+
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        """Get breaker state and counters for monitoring"""
+        with self._lock:
+            retry_in = max(0.0, self._retry_at - time.time()) if self._state == self.OPEN else 0.0
+            return {
+                'name': self.name,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'consecutive_opens': self._consecutive_opens,
+                'retry_in_seconds': round(retry_in, 1),
+                'rejected_calls': self._rejected,
+                'transitions': dict(self._transitions),
+                'last_error': self._last_error
+            }
@@ -0,0 +1,182 @@
+"""
+Coordinate cache module for UV index website.
+Caches nearest-station answers by geohash cell, so nearby GPS fixes share
+one lookup. A cell is only given a cached station when that station is the
+nearest for every point in the cell.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_INDEX = {char: index for index, char in enumerate(GEOHASH_ALPHABET)}
+
+
+def parse_coordinate(latitude, longitude):
+    """Convert a latitude and longitude to floats, checking they are on the globe
+
+    Raises ValueError or TypeError for values that are missing, not numbers,
+    not finite or out of range.
+    """
+    latitude = float(latitude)
+    longitude = float(longitude)
+    if not (math.isfinite(latitude) and math.isfinite(longitude)):
+        raise ValueError('Coordinates must be finite')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('Coordinates out of range')
+    return latitude, longitude
+
+
+def geohash_encode(latitude, longitude, precision=6):
+    """Encode a coordinate as a geohash of the given length"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        # Bits alternate between longitude and latitude, starting with longitude
+        value, value_range = (longitude, lng_range) if even else (latitude, lat_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            value_range[0] = middle
+        else:
+            bits <<= 1
+            value_range[1] = middle
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def geohash_bounds(geohash):
+    """Get the (south, west, north, east) bounds of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for char in geohash:
+        bits = GEOHASH_INDEX[char]
+        for shift in range(4, -1, -1):
+            value_range = lng_range if even else lat_range
+            middle = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = middle
+            else:
+                value_range[1] = middle
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def coordinate_distance(latitude, longitude, city_info):
+    """Euclidean distance in degrees, as used for nearest-station lookups"""
+    return ((latitude - city_info['latitude']) ** 2 + (longitude - city_info['longitude']) ** 2) ** 0.5
+
+
+def find_nearest_cities(latitude, longitude, cities):
+    """Find the nearest city and the distances to the nearest and second nearest
+
+    Returns (nearest_city, nearest_distance, second_distance).
+    """
+    nearest = None
+    nearest_distance = float('inf')
+    second_distance = float('inf')
+
+    for city_info in cities:
+        try:
+            distance = coordinate_distance(latitude, longitude, city_info)
+        except (KeyError, TypeError):
+            continue
+
+        if distance < nearest_distance:
+            second_distance = nearest_distance
+            nearest_distance = distance
+            nearest = city_info
+        elif distance < second_distance:
+            second_distance = distance
+
+    return nearest, nearest_distance, second_distance
+
+
+def find_cell_station(geohash, cities):
+    """Find the station that is nearest for every point in a geohash cell
+
+    Every point in the cell is within half the cell diagonal (r) of its
+    centre, so by the triangle inequality the centre's nearest station wins
+    everywhere in the cell if it beats the runner-up by more than 2r.
+    Returns None when the cell straddles a boundary between stations.
+    """
+    south, west, north, east = geohash_bounds(geohash)
+    center_lat = (south + north) / 2
+    center_lng = (west + east) / 2
+    half_diagonal = (((north - south) / 2) ** 2 + ((east - west) / 2) ** 2) ** 0.5
+
+    nearest, nearest_distance, second_distance = find_nearest_cities(center_lat, center_lng, cities)
+    if nearest is None or second_distance - nearest_distance <= 2 * half_diagonal:
+        return None
+    return nearest
+
+
+class CoordinateCache:
+    """Bounded LRU of per-cell answers, scoped to one UV data version"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._version = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        """Drop all entries when the UV data version changes (lock must be held)"""
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version, cell):
+        """Get the cached answer for a cell, or None"""
+        with self._lock:
+            self._check_version(version)
+            answer = self._entries.get(cell)
+            if answer is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(cell)
+            self._hits += 1
+            return answer
+
+    def put(self, version, cell, answer):
+        """Cache the answer for a cell"""
+        with self._lock:
+            self._check_version(version)
+            self._entries[cell] = answer
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        """Get cache counters and hit rate"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,243 @@
+"""
+Daily UV aggregates module for UV index website.
+Maintains per-station daily peak UV, time of peak and accumulated exposure,
+updated incrementally as each new reading is ingested. The aggregates are
+saved beside the UV snapshot so a restart keeps the day's totals, and a
+station's totals stop being served once its local day has ended.
+"""
+
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+from snapshot_store import write_file_atomically
+
+# Format of the utcdatetime field in the ARPANSA feed
+UTC_DATETIME_FORMAT = '%Y/%m/%d %H:%M'
+# Format of the local date and time fields in the ARPANSA feed
+LOCAL_DATE_FORMAT = '%d/%m/%Y'
+LOCAL_DATETIME_FORMAT = '%d/%m/%Y %I:%M %p'
+
+AGGREGATES_FORMAT_VERSION = 1
+
+# One hour at UV index 1 (25 mW/m2 erythemally weighted) is 0.9 standard erythemal doses
+SED_PER_UV_INDEX_HOUR = 0.9
+
+
+def parse_utc_offset(location, utc_time):
+    """Get a feed location's offset from UTC, or None if its local time can't be parsed"""
+    try:
+        local_time = datetime.strptime(f"{location.get('date', '')} {location.get('time', '')}", LOCAL_DATETIME_FORMAT)
+    except ValueError:
+        return None
+    return local_time - utc_time
+
+
+class StationDailyAggregate:
+    def __init__(self, station_id, local_date):
+        self.station_id = station_id
+        self.local_date = local_date
+        # The station's offset from UTC, used to tell when its local day ends
+        self.utc_offset = None
+        self.peak_uv = None
+        self.peak_time = None
+        self.peak_utc = None
+        self.exposure_uvi_hours = 0.0
+        self.reading_count = 0
+        self.last_uv = None
+        self.last_utc = None
+
+    def add_reading(self, uv_value, local_time, utc_time):
+        """Fold one reading into the aggregate"""
+        # Accumulate exposure with the trapezoidal rule since the previous reading
+        if self.last_utc is not None:
+            hours = (utc_time - self.last_utc).total_seconds() / 3600
+            self.exposure_uvi_hours += hours * (self.last_uv + uv_value) / 2
+
+        if self.peak_uv is None or uv_value > self.peak_uv:
+            self.peak_uv = uv_value
+            self.peak_time = local_time
+            self.peak_utc = utc_time
+
+        self.reading_count += 1
+        self.last_uv = uv_value
+        self.last_utc = utc_time
+
+    def is_current(self, now):
+        """Check whether the aggregate is for the station's current local day
+
+        now is a naive UTC datetime. Without a known UTC offset, the aggregate
+        is current until a day after its last reading.
+        """
+        if self.utc_offset is not None:
+            try:
+                return (now + self.utc_offset).date() == datetime.strptime(self.local_date, LOCAL_DATE_FORMAT).date()
+            except ValueError:
+                pass
+        return self.last_utc is not None and now - self.last_utc < timedelta(days=1)
+
+    def to_state(self):
+        """Convert aggregate to a JSON-serializable dictionary for saving"""
+        return {
+            'station_id': self.station_id,
+            'local_date': self.local_date,
+            'utc_offset_minutes': self.utc_offset.total_seconds() / 60 if self.utc_offset is not None else None,
+            'peak_uv': self.peak_uv,
+            'peak_time': self.peak_time,
+            'peak_utc': self.peak_utc.strftime(UTC_DATETIME_FORMAT) if self.peak_utc else None,
+            'exposure_uvi_hours': self.exposure_uvi_hours,
+            'reading_count': self.reading_count,
+            'last_uv': self.last_uv,
+            'last_utc': self.last_utc.strftime(UTC_DATETIME_FORMAT) if self.last_utc else None
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Create an aggregate from a dictionary made by to_state()"""
+        aggregate = cls(state['station_id'], state['local_date'])
+        if state.get('utc_offset_minutes') is not None:
+            aggregate.utc_offset = timedelta(minutes=state['utc_offset_minutes'])
+        aggregate.peak_uv = state.get('peak_uv')
+        aggregate.peak_time = state.get('peak_time')
+        if state.get('peak_utc'):
+            aggregate.peak_utc = datetime.strptime(state['peak_utc'], UTC_DATETIME_FORMAT)
+        aggregate.exposure_uvi_hours = float(state.get('exposure_uvi_hours', 0.0))
+        aggregate.reading_count = int(state.get('reading_count', 0))
+        aggregate.last_uv = state.get('last_uv')
+        if state.get('last_utc'):
+            aggregate.last_utc = datetime.strptime(state['last_utc'], UTC_DATETIME_FORMAT)
+        return aggregate
+
+    def to_dict(self):
+        """Convert aggregate to dictionary"""
+        return {
+            'city_id': self.station_id,
+            'date': self.local_date,
+            'peak_uv_index': self.peak_uv,
+            'peak_time': self.peak_time,
+            'peak_utcdatetime': self.peak_utc.strftime(UTC_DATETIME_FORMAT) if self.peak_utc else None,
+            'exposure_uvi_hours': round(self.exposure_uvi_hours, 3),
+            'exposure_sed': round(self.exposure_uvi_hours * SED_PER_UV_INDEX_HOUR, 3),
+            'current_uv_index': self.last_uv,
+            'last_utcdatetime': self.last_utc.strftime(UTC_DATETIME_FORMAT) if self.last_utc else None,
+            'reading_count': self.reading_count
+        }
+
+
+def utc_now():
+    """Get the current time as a naive UTC datetime, like the feed's utcdatetime"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DailyAggregates:
+    """Daily aggregates for all stations, saved to path after each update if given"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._stations = {}
+        self._lock = threading.Lock()
+        if path:
+            self.load()
+
+    def load(self):
+        """Load the aggregates saved by the last update, replacing the current ones"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('format') != AGGREGATES_FORMAT_VERSION:
+                print(f"Ignoring daily UV aggregates with unsupported format in {self.path}")
+                return False
+            stations = {
+                state['station_id']: StationDailyAggregate.from_state(state)
+                for state in saved.get('stations', [])
+            }
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error loading daily UV aggregates from {self.path}: {e}")
+            return False
+
+        with self._lock:
+            self._stations = stations
+        return True
+
+    def save(self):
+        """Write the aggregates to disk atomically"""
+        with self._lock:
+            payload = json.dumps({
+                'format': AGGREGATES_FORMAT_VERSION,
+                'stations': [aggregate.to_state() for aggregate in self._stations.values()]
+            }, separators=(',', ':'))
+        write_file_atomically(self.path, payload, prefix='.uv_daily_aggregates-')
+
+    def ingest_location(self, location):
+        """Fold one feed location into its station's aggregate
+
+        Returns True if the reading was new. Readings that are not newer than
+        the last one seen for the station are ignored, so re-ingesting the
+        same snapshot is harmless.
+        """
+        station_id = location.get('@id', '')
+        local_date = location.get('date', '')
+        try:
+            uv_value = float(location.get('index', 0))
+            utc_time = datetime.strptime(location.get('utcdatetime', ''), UTC_DATETIME_FORMAT)
+        except (ValueError, TypeError):
+            return False
+        if not station_id or not local_date:
+            return False
+
+        with self._lock:
+            aggregate = self._stations.get(station_id)
+
+            # The feed's date field is the station's local date, so a change
+            # means the station has passed local midnight
+            if aggregate is None or aggregate.local_date != local_date:
+                if aggregate is not None and aggregate.last_utc and utc_time <= aggregate.last_utc:
+                    return False
+                aggregate = StationDailyAggregate(station_id, local_date)
+                self._stations[station_id] = aggregate
+            elif aggregate.last_utc and utc_time <= aggregate.last_utc:
+                return False
+
+            aggregate.add_reading(uv_value, location.get('time', ''), utc_time)
+            utc_offset = parse_utc_offset(location, utc_time)
+            if utc_offset is not None:
+                aggregate.utc_offset = utc_offset
+            return True
+
+    def ingest(self, uv_data):
+        """Fold every location of a UV snapshot into the aggregates"""
+        locations = uv_data.get('stations', {}).get('location', [])
+        if not isinstance(locations, list):
+            locations = [locations]
+
+        new_readings = sum(1 for location in locations if self.ingest_location(location))
+        if new_readings and self.path:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Error saving daily UV aggregates to {self.path}: {e}")
+        return new_readings
+
+    def get(self, station_id, now=None):
+        """Get the aggregate for one station's current local day as a dictionary
+
+        Returns None if the station has no readings yet for its current day.
+        """
+        now = now or utc_now()
+        with self._lock:
+            aggregate = self._stations.get(station_id)
+            if aggregate is None or not aggregate.is_current(now):
+                return None
+            return aggregate.to_dict()
+
+    def get_all(self, now=None):
+        """Get the aggregates for every station's current local day as dictionaries"""
+        now = now or utc_now()
+        with self._lock:
+            return [
+                self._stations[station_id].to_dict()
+                for station_id in sorted(self._stations)
+                if self._stations[station_id].is_current(now)
+            ]
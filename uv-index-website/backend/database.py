@@ -1,23 +1,146 @@
+import itertools
+import threading
+import time
 import psycopg2
+import psycopg2.errors
 from psycopg2.extras import RealDictCursor
 from config import Config
 
+# Read-only queries, prepared once per connection: name -> (parameter types, query)
+PREPARED_STATEMENTS = {
+    'get_city_by_postcode': (
+        '(text)',
+        'SELECT * FROM cities WHERE postcode = $1 ORDER BY id LIMIT 1'
+    ),
+    'get_all_cities': (
+        '',
+        'SELECT * FROM cities ORDER BY name'
+    ),
+    'find_cities_by_name': (
+        '(text)',
+        'SELECT * FROM cities WHERE name ILIKE $1 ORDER BY name'
+    ),
+    'get_cities_page': (
+        '(text, integer, integer)',
+        'SELECT * FROM cities WHERE (name, id) > ($1, $2) ORDER BY name, id LIMIT $3'
+    )
+}
+
+# Errors that mean a connection is unusable and another server should be tried
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+def connect_reader(dsn):
+    """Open a connection for read-only queries, with connect and statement timeouts"""
+    return psycopg2.connect(
+        dsn,
+        connect_timeout=Config.DATABASE_CONNECT_TIMEOUT,
+        options=f'-c statement_timeout={Config.DATABASE_STATEMENT_TIMEOUT}'
+    )
+
+class ReadConnection:
+    """A connection used for read-only queries, with its statements prepared"""
+
+    def __init__(self, name, dsn):
+        self.name = name
+        self.dsn = dsn
+        self.conn = None
+        self.prepared = False
+        self.down_until = 0
+        self.lock = threading.Lock()
+
+    def is_available(self):
+        """Check whether the connection may be used, or retried after a failure"""
+        return time.time() >= self.down_until
+
+    def ensure_ready(self):
+        """Connect if needed and prepare the read statements (lock must be held)"""
+        if self.conn is None or self.conn.closed:
+            self.conn = connect_reader(self.dsn)
+            self.conn.set_session(readonly=True, autocommit=True)
+            self.prepared = False
+        
+        if not self.prepared:
+            with self.conn.cursor() as cursor:
+                # Start clean in case some statements survived a partial reset
+                cursor.execute("DEALLOCATE ALL;")
+                for statement, (parameter_types, query) in PREPARED_STATEMENTS.items():
+                    cursor.execute(f"PREPARE {statement} {parameter_types} AS {query};")
+            self.prepared = True
+
+    def execute(self, statement, params, fetch_one=False):
+        """Run a prepared statement and fetch its results"""
+        placeholders = f"({', '.join(['%s'] * len(params))})" if params else ''
+        query = f"EXECUTE {statement} {placeholders};"
+        
+        with self.lock:
+            for attempt in range(2):
+                self.ensure_ready()
+                try:
+                    with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                        cursor.execute(query, params)
+                        return cursor.fetchone() if fetch_one else cursor.fetchall()
+                except psycopg2.errors.InvalidSqlStatementName:
+                    # The session lost its prepared statements (e.g. a pooler reset it)
+                    if attempt:
+                        raise
+                    self.prepared = False
+
+    def mark_down(self, retry_after):
+        """Take the connection out of rotation until retry_after seconds have passed"""
+        self.down_until = time.time() + retry_after
+        self.prepared = False
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+
 class Database:
-    def __init__(self):
+    def __init__(self, initialize=True):
+        # Whether to create the schema and seed data on connect; tools that
+        # only read pass False
+        self.initialize = initialize
         self.conn = None
+        self.primary_reader = None
+        self.replicas = [
+            ReadConnection(f'replica-{number}', dsn)
+            for number, dsn in enumerate(Config.DATABASE_REPLICA_URLS, start=1)
+        ]
+        self._replica_counter = itertools.count()
         self.connect()
 
     def connect(self):
         """Connect to PostgreSQL database"""
         try:
-            self.conn = psycopg2.connect(Config.SQLALCHEMY_DATABASE_URI)
+            self.conn = psycopg2.connect(Config.SQLALCHEMY_DATABASE_URI, connect_timeout=Config.DATABASE_CONNECT_TIMEOUT)
             self.conn.autocommit = True
-            self.create_tables()
-            self.insert_initial_data()
+            if self.initialize:
+                self.create_tables()
+                self.insert_initial_data()
+            self.primary_reader = ReadConnection('primary', Config.SQLALCHEMY_DATABASE_URI)
         except Exception as e:
             print(f"Database connection error: {e}")
             raise e
 
+    def _available_replicas(self):
+        """Get the available replicas, rotating the first one so read load spreads across all of them"""
+        if not self.replicas:
+            return []
+        start = next(self._replica_counter) % len(self.replicas)
+        return [replica for replica in self.replicas[start:] + self.replicas[:start] if replica.is_available()]
+
+    def _read(self, statement, params=(), fetch_one=False):
+        """Run a read-only prepared statement on a replica, failing over to the primary"""
+        for replica in self._available_replicas():
+            try:
+                return replica.execute(statement, params, fetch_one)
+            except CONNECTION_ERRORS as e:
+                print(f"Database {replica.name} failed, trying next server: {e}")
+                replica.mark_down(Config.DATABASE_REPLICA_RETRY_TIME)
+        
+        return self.primary_reader.execute(statement, params, fetch_one)
+
     def create_tables(self):
         """Create necessary tables"""
         with self.conn.cursor() as cursor:
@@ -34,6 +157,7 @@ class Database:
             
             CREATE INDEX IF NOT EXISTS idx_cities_postcode ON cities(postcode);
             CREATE INDEX IF NOT EXISTS idx_cities_name ON cities(name);
+            CREATE INDEX IF NOT EXISTS idx_cities_name_id ON cities(name, id);
             """)
 
     def insert_initial_data(self):
@@ -140,29 +264,60 @@ class Database:
 
     def get_city_by_postcode(self, postcode):
         """Get city information by postcode"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute("""
-            SELECT * FROM cities WHERE postcode = %s;
-            """, (postcode,))
-            return cursor.fetchone()
+        return self._read('get_city_by_postcode', (postcode,), fetch_one=True)
 
     def get_all_cities(self):
         """Get all cities"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute("""
-            SELECT * FROM cities ORDER BY name;
-            """)
-            return cursor.fetchall()
+        return self._read('get_all_cities')
+
+    def get_cities_page(self, after_name='', after_id=0, limit=100):
+        """Get a page of cities ordered by name and id, starting after the given key"""
+        return self._read('get_cities_page', (after_name, after_id, limit))
+
+    def iter_all_cities(self, batch_size=1000):
+        """Iterate over all cities ordered by name and id using a server-side cursor
+
+        Rows are fetched batch_size at a time on a dedicated connection, so
+        memory use does not grow with the size of the table. Servers are
+        tried in the same order as other reads until one returns the first
+        batch; errors after that are raised to the caller.
+        """
+        for replica in self._available_replicas() + [None]:
+            dsn = replica.dsn if replica is not None else Config.SQLALCHEMY_DATABASE_URI
+            conn = None
+            try:
+                conn = connect_reader(dsn)
+                conn.set_session(readonly=True)
+                cursor = conn.cursor(name='iter_all_cities', cursor_factory=RealDictCursor)
+                cursor.execute("""
+                SELECT * FROM cities ORDER BY name, id;
+                """)
+                rows = cursor.fetchmany(batch_size)
+            except CONNECTION_ERRORS as e:
+                if conn is not None:
+                    conn.close()
+                if replica is None:
+                    raise
+                print(f"Database {replica.name} failed, trying next server: {e}")
+                replica.mark_down(Config.DATABASE_REPLICA_RETRY_TIME)
+                continue
+            
+            try:
+                while rows:
+                    yield from rows
+                    rows = cursor.fetchmany(batch_size)
+            finally:
+                conn.close()
+            return
 
     def find_cities_by_name(self, name):
         """Find cities by name"""
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cursor:
-            cursor.execute("""
-            SELECT * FROM cities WHERE name ILIKE %s ORDER BY name;
-            """, (f'%{name}%',))
-            return cursor.fetchall()
+        return self._read('find_cities_by_name', (f'%{name}%',))
 
     def close(self):
         """Close database connection"""
+        for reader in self.replicas + [self.primary_reader]:
+            if reader is not None and reader.conn is not None:
+                reader.conn.close()
         if self.conn:
             self.conn.close() 
\ No newline at end of file
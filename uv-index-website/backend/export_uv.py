@@ -0,0 +1,201 @@
+"""
+Bulk export of current UV index for every locality in the cities table.
+
+Streams the cities table with a server-side cursor, resolves every row
+against a single UV snapshot and writes CSV or Parquet incrementally, so
+memory use stays flat however large the table is. The snapshot is the one
+saved by the web app, or is fetched directly from the UV data sources if
+that one has expired. Diagnostics go to stderr, so CSV can be written to
+stdout.
+
+Usage:
+    python export_uv.py --output uv_by_postcode.csv
+    python export_uv.py --format parquet --output uv_by_postcode.parquet
+"""
+
+import argparse
+import csv
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+
+from config import Config
+from locality_store import create_storage
+from mock_data import MOCK_UV_DATA
+from models.city import City
+from postcode_table import find_station_uv_info, get_main_city_name
+from providers import create_providers
+from snapshot import UVSnapshot, fetch_snapshot, load_saved_snapshot
+
+EXPORT_COLUMNS = [
+    'postcode', 'name', 'state', 'latitude', 'longitude',
+    'station', 'uv_index', 'time', 'date', 'stale', 'snapshot_version'
+]
+
+
+def load_export_snapshot(allow_mock=False):
+    """Get the UV snapshot to export against
+
+    Uses the saved snapshot while it is fresh, otherwise fetches the UV data
+    sources directly. An expired saved snapshot is used if the fetch fails.
+    Mock data is only used when allow_mock is set; returns None otherwise.
+    """
+    saved = load_saved_snapshot(Config.UV_SNAPSHOT_PATH)
+    if saved is not None and saved.age() < Config.UV_DATA_CACHE_TIME:
+        return saved
+
+    providers = create_providers(Config.UV_DATA_SOURCES)
+    executor = ThreadPoolExecutor(max_workers=len(providers), thread_name_prefix='uv-fetch')
+    try:
+        snapshot, report = fetch_snapshot(providers, executor, previous=saved)
+        print(f"UV data source results: {report}")
+        return snapshot
+    except Exception as e:
+        print(f"Error getting UV data: {e}")
+    finally:
+        executor.shutdown(wait=False)
+
+    if saved is not None:
+        print(f"Using expired UV snapshot {saved.version} ({saved.age():.0f}s old)")
+        return saved
+    if allow_mock:
+        print("Using mock UV data")
+        return UVSnapshot(MOCK_UV_DATA, 'mock', 0, 'mock')
+    return None
+
+
+def iter_export_rows(storage, snapshot, batch_size):
+    """Yield one export row per city, resolved against the given snapshot"""
+    # Many cities share a station, so each station's UV info is looked up once
+    station_cache = {}
+
+    for row in storage.iter_all_cities(batch_size):
+        city_obj = City.from_db_row(row)
+        main_city = get_main_city_name(city_obj)
+        if main_city not in station_cache:
+            station_cache[main_city] = find_station_uv_info(snapshot.locations_by_id, main_city)
+        uv_info = station_cache[main_city]
+
+        yield {
+            'postcode': city_obj.postcode,
+            'name': city_obj.name,
+            'state': city_obj.state,
+            'latitude': city_obj.latitude,
+            'longitude': city_obj.longitude,
+            'station': uv_info['city_id'] if uv_info else None,
+            'uv_index': uv_info['uv_index'] if uv_info else None,
+            'time': uv_info['time'] if uv_info else None,
+            'date': uv_info['date'] if uv_info else None,
+            'stale': uv_info['stale'] if uv_info else None,
+            'snapshot_version': snapshot.version
+        }
+
+
+def write_csv(rows, output):
+    """Write rows as CSV, one row at a time
+
+    output is a path, or a file object such as stdout.
+    """
+    f = open(output, 'w', newline='', encoding='utf-8') if isinstance(output, str) else output
+    try:
+        writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            yield
+    finally:
+        if f is not output:
+            f.close()
+        else:
+            f.flush()
+
+
+def write_parquet(rows, output, batch_size):
+    """Write rows as Parquet, one row group per batch"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit('Parquet export requires pyarrow: pip install pyarrow')
+
+    schema = pa.schema([
+        ('postcode', pa.string()),
+        ('name', pa.string()),
+        ('state', pa.string()),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('station', pa.string()),
+        ('uv_index', pa.float64()),
+        ('time', pa.string()),
+        ('date', pa.string()),
+        ('stale', pa.bool_()),
+        ('snapshot_version', pa.string())
+    ])
+
+    with pq.ParquetWriter(output, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                batch = []
+            yield
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+
+def export(args, stdout):
+    """Run an export, returning the process exit code"""
+    # Every row is resolved against this one snapshot
+    snapshot = load_export_snapshot(allow_mock=args.allow_mock)
+    if snapshot is None:
+        print("No UV data available: the UV data sources failed and there is no saved snapshot "
+              "(pass --allow-mock to export mock data)")
+        return 1
+    print(f"Exporting UV by postcode from snapshot {snapshot.version} ({snapshot.source})")
+
+    # Read-only: don't create the schema or seed data
+    storage = create_storage(initialize=False)
+    try:
+        rows = iter_export_rows(storage, snapshot, args.batch_size)
+        if args.format == 'csv':
+            progress = write_csv(rows, stdout if args.output == '-' else args.output)
+        else:
+            progress = write_parquet(rows, args.output, args.batch_size)
+
+        started = time.time()
+        count = 0
+        for _ in progress:
+            count += 1
+            if count % 100000 == 0:
+                elapsed = time.time() - started
+                print(f"{count} rows ({count / elapsed:.0f} rows/sec)")
+    finally:
+        storage.close()
+
+    elapsed = max(time.time() - started, 1e-9)
+    print(f"Exported {count} rows in {elapsed:.2f}s ({count / elapsed:.0f} rows/sec)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export current UV index for every postcode')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Output format')
+    parser.add_argument('--output', default='-', help="Output file, or '-' for stdout (CSV only)")
+    parser.add_argument('--batch-size', type=int, default=10000, help='Rows fetched and written per batch')
+    parser.add_argument('--allow-mock', action='store_true', help='Export mock UV data if no real data is available')
+    args = parser.parse_args()
+
+    if args.format == 'parquet' and args.output == '-':
+        parser.error('Parquet export needs an --output file')
+
+    # All diagnostics, including those printed by the modules used here, go
+    # to stderr so they never mix with CSV written to stdout
+    stdout = sys.stdout
+    with redirect_stdout(sys.stderr):
+        sys.exit(export(args, stdout))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Spatial interpolation module for UV index website.
+Estimates the UV index at arbitrary coordinates from the surrounding stations
+using inverse-distance weighting (IDW) over great-circle distances.
+"""
+
+import numpy as np
+
+# Mean Earth radius (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# Points closer than this to a station take the station's reading directly (km)
+EXACT_MATCH_DISTANCE_KM = 1e-6
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres, broadcasting over NumPy arrays"""
+    lat1 = np.radians(lat1)
+    lng1 = np.radians(lng1)
+    lat2 = np.radians(lat2)
+    lng2 = np.radians(lng2)
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def build_station_arrays(stations):
+    """Convert station readings into parallel arrays for vectorized evaluation
+
+    Stations without known coordinates are left out, as they cannot be placed.
+    """
+    usable = [
+        station for station in stations
+        if station.get('latitude') or station.get('longitude')
+    ]
+    latitudes = np.array([s['latitude'] for s in usable], dtype=float)
+    longitudes = np.array([s['longitude'] for s in usable], dtype=float)
+    values = np.array([s['uv_index'] for s in usable], dtype=float)
+    return usable, latitudes, longitudes, values
+
+
+def idw_interpolate(latitudes, longitudes, station_lats, station_lngs, station_values, k=4, power=2.0):
+    """Estimate UV index at many points in one pass
+
+    Returns (estimates, neighbour_indices, distances_km, weights), each with one
+    row per input point. Neighbour rows are ordered nearest first.
+    """
+    latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))
+    longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))
+    station_count = len(station_values)
+    if station_count == 0:
+        raise ValueError('No stations available for interpolation')
+
+    k = max(1, min(int(k), station_count))
+
+    # Distance from every point to every station, shape (points, stations)
+    distances = haversine_km(
+        latitudes[:, np.newaxis], longitudes[:, np.newaxis],
+        station_lats[np.newaxis, :], station_lngs[np.newaxis, :]
+    )
+
+    # Select the k nearest stations per point, then order them by distance
+    if k < station_count:
+        neighbours = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        neighbours = np.tile(np.arange(station_count), (len(latitudes), 1))
+    neighbour_distances = np.take_along_axis(distances, neighbours, axis=1)
+    order = np.argsort(neighbour_distances, axis=1)
+    neighbours = np.take_along_axis(neighbours, order, axis=1)
+    neighbour_distances = np.take_along_axis(neighbour_distances, order, axis=1)
+
+    # Inverse-distance weights; a point sitting on a station takes its value
+    exact = neighbour_distances[:, 0] < EXACT_MATCH_DISTANCE_KM
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / np.power(neighbour_distances, power)
+    weights[exact] = 0.0
+    weights[exact, 0] = 1.0
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    estimates = (weights * station_values[neighbours]).sum(axis=1)
+    return estimates, neighbours, neighbour_distances, weights
+
+
+def interpolate_points(stations, points, k=4, power=2.0):
+    """Interpolate UV index for a list of (latitude, longitude) points
+
+    Returns one result dictionary per point, including the stations that
+    contributed to the estimate and their weights.
+    """
+    usable, station_lats, station_lngs, station_values = build_station_arrays(stations)
+    if not points:
+        return []
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    estimates, neighbours, distances, weights = idw_interpolate(
+        points[:, 0], points[:, 1],
+        station_lats, station_lngs, station_values,
+        k=k, power=power
+    )
+
+    results = []
+    for row in range(len(points)):
+        contributors = []
+        for column in range(neighbours.shape[1]):
+            station = usable[neighbours[row, column]]
+            contributors.append({
+                'city': station['city'],
+                'city_id': station['city_id'],
+                'uv_index': station['uv_index'],
+                'distance_km': round(float(distances[row, column]), 3),
+                'weight': round(float(weights[row, column]), 6)
+            })
+        results.append({
+            'latitude': float(points[row, 0]),
+            'longitude': float(points[row, 1]),
+            'uv_index': round(float(estimates[row]), 2),
+            'stations': contributors
+        })
+    return results
@@ -0,0 +1,271 @@
+"""
+Locality store module for UV index website.
+An embedded, read-only copy of the cities table in a SQLite file, so web
+workers can serve city lookups in-process instead of querying Postgres over
+the network. Postgres stays the system of record; the file is rebuilt from it
+(or from a CSV) and swapped in atomically.
+
+Usage:
+    python locality_store.py --from-db
+    python locality_store.py --from-csv cities.csv --output localities.sqlite3
+"""
+
+import argparse
+import csv
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from config import Config
+
+CITY_COLUMNS = ('id', 'name', 'postcode', 'latitude', 'longitude', 'state', 'created_at')
+
+
+def build_locality_store(path, rows):
+    """Write city rows to a new locality store file atomically
+
+    The file is built under a temporary name in the same directory and
+    renamed over the old one. Workers that already have the old file open
+    keep reading it until they reopen, so a rebuild never disturbs them.
+    Returns the number of rows written.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix='.localities-', dir=directory)
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute("""
+            CREATE TABLE cities (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                postcode TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                state TEXT NOT NULL,
+                created_at TEXT
+            )
+            """)
+
+            count = 0
+            cursor = conn.cursor()
+            for row in rows:
+                cursor.execute(
+                    "INSERT INTO cities (id, name, postcode, latitude, longitude, state, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        row.get('id'),
+                        row['name'],
+                        str(row['postcode']),
+                        float(row['latitude']),
+                        float(row['longitude']),
+                        row['state'],
+                        str(row['created_at']) if row.get('created_at') else None
+                    )
+                )
+                count += 1
+
+            conn.execute("CREATE INDEX idx_cities_postcode ON cities(postcode, id)")
+            conn.execute("CREATE INDEX idx_cities_name_id ON cities(name, id)")
+            conn.execute("ANALYZE")
+            conn.commit()
+            # Compact the file so it is contiguous on disk for memory mapping
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+        return count
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def read_cities_csv(path):
+    """Iterate over city rows in a CSV file with a header row
+
+    Needs name, postcode, latitude, longitude and state columns; id and
+    created_at are optional.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row.get('id'):
+                row['id'] = int(row['id'])
+            else:
+                row['id'] = None
+            yield row
+
+
+def _dict_factory(cursor, row):
+    """Return rows as dictionaries, like RealDictCursor does for Postgres"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class LocalityStore:
+    """Read-only city lookups from a locality store file
+
+    Provides the same read methods as Database. The file is opened immutable
+    and memory-mapped through a bounded pool of connections, so the number of
+    open connections does not grow with the number of request threads.
+    """
+
+    def __init__(self, path, mmap_size=None, pool_size=None):
+        self.path = path
+        self.mmap_size = mmap_size if mmap_size is not None else Config.LOCALITY_STORE_MMAP_SIZE
+        self.pool_size = max(1, pool_size if pool_size is not None else Config.LOCALITY_STORE_POOL_SIZE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Locality store not found at {path}, build it with locality_store.py")
+        # Idle connections, reused most recently returned first so a few warm ones serve most lookups
+        self._idle = []
+        self._opened = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def _open(self):
+        """Open a new connection to the store file"""
+        # immutable=1 tells SQLite the file never changes, so it skips all locking
+        uri = f"file:{os.path.abspath(self.path)}?mode=ro&immutable=1"
+        # Connections move between threads through the pool, but only one uses a connection at a time
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = _dict_factory
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a connection from the pool, waiting if all of them are in use"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Locality store is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._opened < self.pool_size:
+                    self._opened += 1
+                    conn = None
+                    break
+                self._condition.wait()
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._condition:
+                    self._opened -= 1
+                    self._condition.notify()
+                raise
+
+        try:
+            yield conn
+        finally:
+            with self._condition:
+                if not self._closed:
+                    self._idle.append(conn)
+                    self._condition.notify()
+                    conn = None
+                else:
+                    self._opened -= 1
+            if conn is not None:
+                conn.close()
+
+    def get_city_by_postcode(self, postcode):
+        """Get city by postcode"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT * FROM cities WHERE postcode = ? ORDER BY id LIMIT 1", (postcode,)
+            ).fetchone()
+
+    def get_all_cities(self):
+        """Get all cities"""
+        with self._connection() as conn:
+            return conn.execute("SELECT * FROM cities ORDER BY name, id").fetchall()
+
+    def get_cities_page(self, after_name='', after_id=0, limit=100):
+        """Get a page of cities ordered by name and id, starting after the given key"""
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT * FROM cities WHERE (name, id) > (?, ?) ORDER BY name, id LIMIT ?",
+                (after_name, after_id, limit)
+            ).fetchall()
+
+    def iter_all_cities(self, batch_size=1000):
+        """Iterate over all cities ordered by name and id, batch_size rows at a time
+
+        Holds a pooled connection until the iteration finishes or is closed.
+        """
+        with self._connection() as conn:
+            cursor = conn.execute("SELECT * FROM cities ORDER BY name, id")
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def find_cities_by_name(self, name):
+        """Find cities by name"""
+        # LIKE is case-insensitive for ASCII in SQLite, matching ILIKE in Postgres
+        with self._connection() as conn:
+            return conn.execute(
+                "SELECT * FROM cities WHERE name LIKE ? ORDER BY name, id", (f'%{name}%',)
+            ).fetchall()
+
+    def close(self):
+        """Close idle connections; connections in use are closed when returned"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+            # Wake waiting threads so they fail instead of waiting forever
+            self._condition.notify_all()
+        for conn in idle:
+            conn.close()
+
+
+def create_storage(initialize=True):
+    """Create the city storage backend selected by Config.STORAGE_BACKEND
+
+    initialize is passed to Database, to create the Postgres schema and seed
+    data on connect.
+    """
+    if Config.STORAGE_BACKEND == 'locality':
+        return LocalityStore(Config.LOCALITY_STORE_PATH)
+    if Config.STORAGE_BACKEND == 'postgres':
+        from database import Database
+        return Database(initialize=initialize)
+    raise ValueError(f"Unknown storage backend: {Config.STORAGE_BACKEND}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the read-only locality store file')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--from-db', action='store_true', help='Copy the cities table from Postgres')
+    source.add_argument('--from-csv', metavar='PATH', help='Load cities from a CSV file')
+    parser.add_argument('--output', default=Config.LOCALITY_STORE_PATH, help='Locality store file to write')
+    args = parser.parse_args()
+
+    started = time.time()
+    if args.from_db:
+        from database import Database
+        db = Database()
+        try:
+            count = build_locality_store(args.output, db.iter_all_cities())
+        finally:
+            db.close()
+    else:
+        count = build_locality_store(args.output, read_cities_csv(args.from_csv))
+
+    print(f"Built locality store {args.output} with {count} cities in {time.time() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Postcode response table module for UV index website.
+Builds the /api/uv-index/postcode response for every postcode once per UV
+snapshot, stored pre-serialized so the endpoint is a single dictionary lookup.
+"""
+
+import json
+
+from models.city import City
+from city_mapping import get_city_info_by_id
+
+
+def get_main_city_name(city_obj):
+    """Get the UV station name for a city, mapping Melbourne and Sydney suburbs to the main city"""
+    city_name = city_obj.name
+    main_city = city_name
+
+    # If city name contains Melbourne or Sydney suburbs, use main city name
+    if "Melbourne" in city_name or city_obj.state == "VIC" and city_obj.postcode.startswith("3"):
+        main_city = "Melbourne"
+    elif "Sydney" in city_name or city_obj.state == "NSW" and city_obj.postcode.startswith("20"):
+        main_city = "Sydney"
+
+    return main_city
+
+
+def index_locations(uv_data):
+    """Index UV data locations by station ID, keeping the first reading per station"""
+    locations = uv_data.get('stations', {}).get('location', [])
+    if not isinstance(locations, list):
+        locations = [locations]
+
+    locations_by_id = {}
+    for location in locations:
+        locations_by_id.setdefault(location.get('@id', ''), location)
+    return locations_by_id
+
+
+def find_station_uv_info(locations_by_id, main_city):
+    """Build the UV info for a station, or None if it has no usable reading"""
+    location = locations_by_id.get(main_city)
+    city_info = get_city_info_by_id(main_city)
+    if not location or not city_info:
+        return None
+
+    try:
+        uv_value = float(location.get('index', 0))
+    except (ValueError, TypeError):
+        return None
+
+    return {
+        'city': city_info['name'],
+        'city_id': main_city,
+        'state': city_info['state'],
+        'uv_index': uv_value,
+        'time': location.get('time', ''),
+        'date': location.get('date', ''),
+        'latitude': city_info['latitude'],
+        'longitude': city_info['longitude'],
+        # Carried over from an earlier snapshot while its source is failing
+        'stale': bool(location.get('@stale'))
+    }
+
+
+def build_postcode_response(city_obj, locations_by_id, postcode):
+    """Build the postcode endpoint response for a city"""
+    main_city = get_main_city_name(city_obj)
+    uv_info = find_station_uv_info(locations_by_id, main_city)
+
+    if not uv_info:
+        return {
+            'city': city_obj.to_dict(),
+            'uv_index': None,
+            'message': f'No UV index data found for {main_city}'
+        }
+
+    return {
+        'city': city_obj.to_dict(),
+        'uv_index': uv_info,
+        'original_query': {
+            'postcode': postcode
+        }
+    }
+
+
+def serialize_response(response):
+    """Serialize a response the same way jsonify does in production"""
+    return json.dumps(response, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+class PostcodeTable:
+    def __init__(self, version, responses):
+        self.version = version
+        self.responses = responses
+
+    def get(self, postcode):
+        """Get the pre-serialized response for a postcode"""
+        return self.responses.get(postcode)
+
+
+def build_postcode_table(city_rows, locations_by_id, version):
+    """Build pre-serialized responses for every postcode in the cities table
+
+    Where several cities share a postcode, the one with the lowest ID is used,
+    matching Database.get_city_by_postcode().
+    """
+    cities_by_postcode = {}
+    for row in city_rows:
+        current = cities_by_postcode.get(row['postcode'])
+        if current is None or row['id'] < current['id']:
+            cities_by_postcode[row['postcode']] = row
+
+    responses = {}
+    for postcode, row in cities_by_postcode.items():
+        city_obj = City.from_db_row(row)
+        responses[postcode] = serialize_response(build_postcode_response(city_obj, locations_by_id, postcode))
+    return PostcodeTable(version, responses)
@@ -0,0 +1,121 @@
+"""
+Request profiling module for UV index website.
+Provides opt-in cProfile dumps for sampled or explicitly requested requests,
+and lightweight timing spans reported in the Server-Timing header.
+"""
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+from config import Config
+
+# Aggregated span timings across all requests, by span name
+_span_totals = {}
+_span_lock = threading.Lock()
+
+
+def record_span(name, duration_ms):
+    """Record a timing span for the current request"""
+    if not Config.PROFILING_ENABLED:
+        return
+
+    with _span_lock:
+        count, total = _span_totals.get(name, (0, 0.0))
+        _span_totals[name] = (count + 1, total + duration_ms)
+
+    if has_request_context():
+        spans = g.setdefault('profiling_spans', [])
+        spans.append((name, duration_ms))
+
+
+@contextmanager
+def span(name):
+    """Time a block of code as a named span of the current request"""
+    if not Config.PROFILING_ENABLED:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, (time.perf_counter() - started) * 1000)
+
+
+def get_span_stats():
+    """Get aggregated span timings across all requests"""
+    with _span_lock:
+        return {
+            name: {
+                'count': count,
+                'total_ms': round(total, 3),
+                'mean_ms': round(total / count, 3) if count else 0.0
+            }
+            for name, (count, total) in sorted(_span_totals.items())
+        }
+
+
+def _should_profile():
+    """Decide whether to run cProfile for the current request"""
+    token = request.headers.get(Config.PROFILE_HEADER)
+    if token and Config.PROFILE_TOKEN and token == Config.PROFILE_TOKEN:
+        return True
+    return random.random() < Config.PROFILE_SAMPLE_RATE
+
+
+def _dump_profile(profiler):
+    """Write the current request's profile to the profile directory, tagged by route"""
+    route = request.endpoint or 'unknown'
+    route = re.sub(r'[^A-Za-z0-9_.-]', '_', route)
+    filename = f"{route}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{threading.get_ident()}.prof"
+
+    os.makedirs(Config.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(Config.PROFILE_DIR, filename)
+    profiler.dump_stats(path)
+    return path
+
+
+def init_profiling(app):
+    """Register request hooks for profiling on a Flask app"""
+    if not Config.PROFILING_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_profiling():
+        g.profiling_started = time.perf_counter()
+        if _should_profile():
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Python 3.12+ allows only one active profiler, so skip this
+                # request if another one is already being profiled
+                print(f"Skipping request profile: {e}")
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def finish_request_profiling(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            try:
+                print(f"Saved request profile to {_dump_profile(profiler)}")
+            except OSError as e:
+                print(f"Error saving request profile: {e}")
+
+        # Report spans and total time, e.g. "db_query;dur=1.2, total;dur=3.4"
+        timings = [f'{name};dur={duration:.2f}' for name, duration in g.get('profiling_spans', [])]
+        started = g.get('profiling_started')
+        if started is not None:
+            timings.append(f'total;dur={(time.perf_counter() - started) * 1000:.2f}')
+        if timings:
+            response.headers['Server-Timing'] = ', '.join(timings)
+        return response
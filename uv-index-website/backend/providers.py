@@ -0,0 +1,226 @@
+"""
+UV data providers module for UV index website.
+Defines pluggable UV data sources, fetches them concurrently with per-source
+timeouts and merges their readings into a single snapshot.
+"""
+
+import json
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+import requests
+import xmltodict
+
+from circuit_breaker import CircuitBreaker, CircuitBreakerOpenError
+
+# Format of the utcdatetime field in the ARPANSA feed
+UTC_DATETIME_FORMAT = '%Y/%m/%d %H:%M'
+
+
+class UpstreamUnavailableError(Exception):
+    """Raised when no UV data source returned any readings"""
+
+
+class UVProvider:
+    """Base class for UV data sources
+
+    Subclasses implement parse() to turn a response body into a list of
+    locations in the ARPANSA feed shape ('@id', 'name', 'index', 'time',
+    'date', 'utcdatetime', 'status').
+    """
+
+    def __init__(self, name, url, timeout=10.0, connect_timeout=3.05, breaker=None):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def download(self):
+        """Download the raw response body from the source"""
+        response = requests.get(self.url, timeout=(self.connect_timeout, self.timeout))
+        response.raise_for_status()
+        return response.text
+
+    def parse(self, body):
+        raise NotImplementedError
+
+
+class ArpansaXMLProvider(UVProvider):
+    """ARPANSA uvvalues.xml feed, or a mirror of it"""
+
+    def parse(self, body):
+        data = xmltodict.parse(body)
+        locations = (data.get('stations') or {}).get('location', [])
+        if not isinstance(locations, list):
+            locations = [locations]
+        return locations
+
+
+class JSONProvider(UVProvider):
+    """JSON feed of readings, such as our own sensors
+
+    Accepts either a list of readings or {"locations": [...]}. Readings may
+    use 'id' in place of '@id' and 'uv_index' in place of 'index'.
+    """
+
+    def parse(self, body):
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get('locations', [])
+
+        locations = []
+        for reading in data:
+            location = dict(reading)
+            if '@id' not in location and 'id' in location:
+                location['@id'] = location.pop('id')
+            if 'index' not in location and 'uv_index' in location:
+                location['index'] = str(location.pop('uv_index'))
+            locations.append(location)
+        return locations
+
+
+PROVIDER_TYPES = {
+    'arpansa_xml': ArpansaXMLProvider,
+    'json': JSONProvider
+}
+
+
+def create_providers(source_configs, breaker_options=None):
+    """Create providers from a list of source configuration dictionaries"""
+    providers = []
+    for source in source_configs:
+        provider_class = PROVIDER_TYPES.get(source.get('type', 'arpansa_xml'))
+        if provider_class is None:
+            raise ValueError(f"Unknown UV data source type: {source.get('type')}")
+        providers.append(provider_class(
+            source['name'],
+            source['url'],
+            timeout=float(source.get('timeout', 10)),
+            breaker=CircuitBreaker(source['name'], **(breaker_options or {}))
+        ))
+    return providers
+
+
+def _reading_time(location):
+    """Parse a location's UTC reading time, treating bad values as oldest"""
+    try:
+        return datetime.strptime(location.get('utcdatetime', ''), UTC_DATETIME_FORMAT)
+    except (ValueError, TypeError):
+        return datetime.min
+
+
+def merge_locations(source_locations):
+    """Reconcile readings from several sources into one list of locations
+
+    source_locations is a list of location lists in priority order. For each
+    station the most recent reading wins; on equal times the earlier source
+    wins.
+    """
+    merged = {}
+    order = []
+    for locations in source_locations:
+        for location in locations:
+            station_id = location.get('@id', '')
+            if not station_id:
+                continue
+            current = merged.get(station_id)
+            if current is None:
+                order.append(station_id)
+                merged[station_id] = location
+            elif _reading_time(location) > _reading_time(current):
+                merged[station_id] = location
+    return [merged[station_id] for station_id in order]
+
+
+def carry_over_locations(locations, previous_data, failed_sources):
+    """Keep the previous readings of stations that only failed sources report
+
+    Readings in previous_data are tagged with the source that reported them.
+    Any station from a failed source that no healthy source reported this
+    time is carried over from the previous snapshot, marked stale, so a
+    source outage does not make its stations disappear.
+    Returns the number of readings carried over per failed source.
+    """
+    carried = {}
+    if not previous_data or not failed_sources:
+        return carried
+
+    previous = previous_data.get('stations', {}).get('location', [])
+    if not isinstance(previous, list):
+        previous = [previous]
+
+    present = {location.get('@id', '') for location in locations}
+    for location in previous:
+        source = location.get('@source')
+        station_id = location.get('@id', '')
+        if source not in failed_sources or not station_id or station_id in present:
+            continue
+        locations.append(dict(location, **{'@stale': True}))
+        present.add(station_id)
+        carried[source] = carried.get(source, 0) + 1
+    return carried
+
+
+def _timed_fetch(provider):
+    """Fetch a provider, also returning how long the download and parse took"""
+    started = time.perf_counter()
+    raw_body = provider.download()
+    downloaded = time.perf_counter()
+    locations = provider.parse(raw_body)
+    return raw_body, locations, downloaded - started, time.perf_counter() - downloaded
+
+
+def fetch_all(providers, executor, previous_data=None):
+    """Fetch all providers concurrently and merge their readings
+
+    Each source runs on the executor with its own deadline, so the total
+    latency is that of the slowest source rather than the sum. Stations of
+    sources that fail are carried over from previous_data, marked stale.
+    Returns (data, raw_bodies, report) where data has the ARPANSA feed shape.
+    """
+    futures = {}
+    report = {}
+    for provider in providers:
+        if not provider.breaker.allow_request():
+            report[provider.name] = {'status': 'skipped', 'error': f'Circuit {provider.name} is open'}
+            continue
+        futures[provider.name] = (provider, executor.submit(_timed_fetch, provider), time.time())
+
+    raw_bodies = {}
+    results = {}
+    for name, (provider, future, started) in futures.items():
+        remaining = max(0.0, provider.timeout - (time.time() - started))
+        try:
+            raw_bodies[name], results[name], download_time, parse_time = future.result(timeout=remaining)
+            provider.breaker.record_success()
+            # Tag readings with their source, so a later outage knows which to carry over
+            for location in results[name]:
+                location['@source'] = name
+            report[name] = {
+                'status': 'ok',
+                'locations': len(results[name]),
+                'download_ms': round(download_time * 1000, 1),
+                'parse_ms': round(parse_time * 1000, 1)
+            }
+        except FutureTimeoutError:
+            future.cancel()
+            provider.breaker.record_failure('deadline exceeded')
+            report[name] = {'status': 'error', 'error': 'deadline exceeded'}
+        except Exception as e:
+            provider.breaker.record_failure(e)
+            report[name] = {'status': 'error', 'error': str(e)}
+
+    if not results:
+        if futures:
+            raise UpstreamUnavailableError(f'All UV data sources failed: {report}')
+        raise CircuitBreakerOpenError('All UV data source circuits are open')
+
+    # Merge in provider order so configuration order sets the tie-break priority
+    locations = merge_locations([results[p.name] for p in providers if p.name in results])
+
+    failed_sources = {p.name for p in providers if p.name not in results}
+    for name, count in carry_over_locations(locations, previous_data, failed_sources).items():
+        report[name]['carried_over'] = count
+    return {'stations': {'location': locations}}, raw_bodies, report
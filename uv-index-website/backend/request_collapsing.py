@@ -0,0 +1,151 @@
+"""
+Request collapsing module for UV index website.
+Concurrent identical requests wait on a single in-flight computation and
+share its serialized response, so a burst of lookups for the same postcode
+or search prefix runs the database query and response build only once.
+Followers wait no longer than the route's admission queue timeout, and
+responses from shed or degraded requests are never shared.
+"""
+
+import threading
+from functools import wraps
+
+from flask import Response, make_response, request
+
+from admission import overloaded_response
+
+# Headers rebuilt for each response rather than copied from the shared one
+SKIPPED_HEADERS = ('Content-Length', 'Server-Timing')
+# Headers marking a response from a shed or degraded request, which followers must not reuse
+UNSHARED_HEADERS = ('retry-after', 'x-degraded')
+
+
+class CollapsedRequestTimeout(Exception):
+    """Raised when a follower gives up waiting for the in-flight computation"""
+    pass
+
+
+class InFlightCall:
+    """A computation that concurrent duplicate requests wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # Set when the leader's result must not be shared with followers
+        self.unshared = False
+
+
+class RequestCollapser:
+    """Runs one computation per key at a time and shares its result"""
+
+    def __init__(self):
+        self._calls = {}
+        self._requests = 0
+        self._executions = 0
+        self._shared = 0
+        self._timed_out = 0
+        self._retried = 0
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, timeout=None, shareable=None):
+        """Get compute()'s result, joining an in-flight call with the same key
+
+        Returns (result, shared), where shared is True if the result came
+        from another request's computation. Errors are shared the same way.
+        A follower waits up to timeout seconds, then raises
+        CollapsedRequestTimeout. If shareable(result) is False, followers
+        run compute() themselves instead of reusing the result.
+        """
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._shared += 1
+                leader = False
+            else:
+                call = InFlightCall()
+                self._calls[key] = call
+                self._executions += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self._shared -= 1
+                    self._timed_out += 1
+                raise CollapsedRequestTimeout(f"Timed out after {timeout}s waiting for an identical request")
+            if call.unshared:
+                with self._lock:
+                    self._shared -= 1
+                    self._retried += 1
+                    self._executions += 1
+                return compute(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = compute()
+            if shareable is not None and not shareable(call.result):
+                call.unshared = True
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Remove the call before waking followers, so later requests start a fresh one
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        """Get request counters and the fraction of requests that were collapsed"""
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'requests': self._requests,
+                'executions': self._executions,
+                'shared': self._shared,
+                'timed_out': self._timed_out,
+                'retried': self._retried,
+                'collapse_ratio': round(self._shared / self._requests, 4) if self._requests else 0.0
+            }
+
+
+def collapse_requests(collapser, key_func=None, limiter=None):
+    """Decorate a view so concurrent identical requests share one response
+
+    key_func(*args, **kwargs) returns the normalized arguments identifying
+    a request; by default these are the view arguments and sorted query
+    string. The route's endpoint name is always part of the key. With the
+    route's admission limiter given, followers wait at most its
+    queue_timeout and are then rejected with 503, like queued requests.
+    """
+    timeout = limiter.queue_timeout if limiter is not None else None
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if key_func is not None:
+                arguments = key_func(*args, **kwargs)
+            else:
+                arguments = (tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            key = (request.endpoint, arguments)
+
+            def compute():
+                response = make_response(view(*args, **kwargs))
+                headers = [(name, value) for name, value in response.headers.items() if name not in SKIPPED_HEADERS]
+                return response.get_data(), response.status_code, headers
+
+            def shareable(result):
+                _, _, headers = result
+                return not any(name.lower() in UNSHARED_HEADERS for name, _ in headers)
+
+            try:
+                (body, status, headers), _ = collapser.do(key, compute, timeout=timeout, shareable=shareable)
+            except CollapsedRequestTimeout:
+                return overloaded_response(limiter)
+            return Response(body, status=status, headers=headers)
+        return wrapper
+    return decorator
@@ -0,0 +1,174 @@
+"""
+UV snapshot module for UV index website.
+A snapshot bundles one ingested version of the UV data with its fetch time
+and derived indexes. Snapshots are immutable, so a new one is published with
+a single reference swap and readers never need a lock.
+"""
+
+import hashlib
+import json
+import time
+from types import MappingProxyType
+
+from city_mapping import get_city_info_by_id, get_city_info_by_short_name
+from postcode_table import index_locations
+from providers import fetch_all
+from snapshot_store import load_snapshot
+from station_index import StationIndex
+
+
+def build_station_readings(uv_data):
+    """Build the list of station readings from UV data"""
+    # Extract UV index for all locations
+    locations = uv_data.get('stations', {}).get('location', [])
+    if not isinstance(locations, list):
+        locations = [locations]
+    
+    print(f"Found {len(locations)} location records")
+    
+    result = []
+    for location in locations:
+        try:
+            # Get city ID and short name
+            city_id = location.get('@id', '')
+            short_name = location.get('name', '')
+            
+            # Get city info from mapping
+            city_info = get_city_info_by_id(city_id)
+            
+            if not city_info:
+                print(f"City ID '{city_id}' has no mapping, trying to find by short name...")
+                # Try to find by short name
+                if short_name:
+                    city_info = get_city_info_by_short_name(short_name)
+                
+                # If still not found, create basic info
+                if not city_info:
+                    print(f"Cannot find city info, using basic info: {city_id}, {short_name}")
+                    city_info = {
+                        "id": city_id,
+                        "name": city_id or "Unknown City",
+                        "short_name": short_name,
+                        "state": "Unknown",
+                        "latitude": 0,
+                        "longitude": 0
+                    }
+            
+            # Get UV index value
+            uv_value = 0
+            try:
+                uv_value = float(location.get('index', 0))
+            except (ValueError, TypeError) as e:
+                print(f"Error parsing UV index value: {e}")
+                continue
+            
+            # Get time, date and status
+            time_value = location.get('time', '')
+            date_value = location.get('date', '')
+            status_value = location.get('status', '')
+            
+            # Skip if status is not OK (optional)
+            if status_value and status_value.lower() != 'ok':
+                print(f"City {city_id} status is not OK: {status_value}")
+                # You can choose to skip or continue based on requirements
+                # continue
+            
+            # Add to result list
+            result.append({
+                'city': city_info['name'],
+                'city_id': city_id,
+                'short_name': short_name,
+                'state': city_info['state'],
+                'uv_index': uv_value,
+                'time': time_value,
+                'date': date_value,
+                'latitude': city_info['latitude'],
+                'longitude': city_info['longitude'],
+                'status': status_value,
+                'stale': bool(location.get('@stale'))
+            })
+        except Exception as e:
+            # Skip data with unexpected format
+            print(f"Error processing location: {e}, data: {location}")
+            continue
+    
+    print(f"Successfully processed {len(result)} location data")
+    return result
+
+
+def compute_version(data):
+    """Get a stable version identifier for UV data"""
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+class UVSnapshot:
+    """Immutable UV data snapshot with its derived indexes"""
+
+    __slots__ = (
+        'data', 'version', 'fetched_at', 'source', 'raw',
+        'locations_by_id', 'station_readings', 'station_index'
+    )
+
+    def __init__(self, data, version, fetched_at, source, raw=None, query_cache_size=128):
+        readings = build_station_readings(data)
+        values = {
+            'data': data,
+            'version': version,
+            'fetched_at': fetched_at,
+            'source': source,
+            'raw': raw,
+            'locations_by_id': MappingProxyType(index_locations(data)),
+            'station_readings': tuple(readings),
+            'station_index': StationIndex(version, readings, cache_size=query_cache_size)
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('UVSnapshot is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('UVSnapshot is immutable')
+
+    def age(self):
+        """Seconds since the snapshot was fetched"""
+        return time.time() - self.fetched_at
+
+
+def load_saved_snapshot(path, query_cache_size=128):
+    """Load the snapshot saved by the last successful fetch, or None if there is none
+
+    The snapshot keeps its original fetch time, so an old one counts as expired.
+    """
+    saved = load_snapshot(path)
+    if not saved:
+        return None
+    return UVSnapshot(
+        saved['data'],
+        saved['version'],
+        saved['fetched_at'],
+        'snapshot',
+        query_cache_size=query_cache_size
+    )
+
+
+def fetch_snapshot(providers, executor, previous=None, query_cache_size=128):
+    """Fetch all UV data sources and build a snapshot from their merged readings
+
+    Stations of sources that fail are carried over from the previous
+    snapshot. Returns (snapshot, report) with the per-source fetch report.
+    """
+    data, raw_bodies, report = fetch_all(
+        providers,
+        executor,
+        previous_data=previous.data if previous is not None else None
+    )
+    snapshot = UVSnapshot(
+        data,
+        compute_version(data),
+        time.time(),
+        'upstream',
+        raw=raw_bodies.get(providers[0].name),
+        query_cache_size=query_cache_size
+    )
+    return snapshot, report
@@ -0,0 +1,65 @@
+"""
+Snapshot store module for UV index website.
+Persists the latest UV snapshot to a local file so a restarted worker can
+serve recent data immediately instead of waiting on the upstream feed.
+"""
+
+import json
+import os
+import tempfile
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def write_file_atomically(path, payload, prefix='.tmp-'):
+    """Write text to a file atomically
+
+    The text is written to a temporary file in the same directory and
+    renamed over the old one, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=prefix, dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def save_snapshot(path, data, version, fetched_at):
+    """Write a UV snapshot to disk atomically"""
+    payload = json.dumps({
+        'format': SNAPSHOT_FORMAT_VERSION,
+        'version': version,
+        'fetched_at': fetched_at,
+        'data': data
+    }, separators=(',', ':'))
+    write_file_atomically(path, payload, prefix='.uv_snapshot-')
+
+
+def load_snapshot(path):
+    """Load a UV snapshot from disk
+
+    Returns a dictionary with 'data', 'version' and 'fetched_at', or None if
+    there is no usable snapshot.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error loading UV snapshot from {path}: {e}")
+        return None
+
+    if snapshot.get('format') != SNAPSHOT_FORMAT_VERSION or not snapshot.get('data'):
+        print(f"Ignoring UV snapshot with unsupported format in {path}")
+        return None
+    return snapshot
@@ -0,0 +1,151 @@
+"""
+Station index module for UV index website.
+Indexes the station readings of a UV snapshot for filtered, sparse-field
+queries on /api/uv-index, caching serialized responses per snapshot.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Fields available on each station reading
+STATION_FIELDS = (
+    'city', 'city_id', 'short_name', 'state', 'uv_index',
+    'time', 'date', 'latitude', 'longitude', 'status', 'stale'
+)
+
+
+class StationIndex:
+    def __init__(self, version, readings, cache_size=128):
+        self.version = version
+        self.readings = readings
+        self.cache_size = cache_size
+
+        # Rows grouped by lower-cased state, plus column arrays for range filters
+        self.by_state = {}
+        for row, reading in enumerate(readings):
+            self.by_state.setdefault(str(reading['state']).lower(), []).append(row)
+        self.latitudes = np.array([r['latitude'] for r in readings], dtype=float)
+        self.longitudes = np.array([r['longitude'] for r in readings], dtype=float)
+        self.uv_values = np.array([r['uv_index'] for r in readings], dtype=float)
+
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def query(self, states=None, min_uv=None, bbox=None):
+        """Get the row numbers of readings matching all given filters, in feed order"""
+        mask = np.ones(len(self.readings), dtype=bool)
+
+        if states:
+            state_mask = np.zeros(len(self.readings), dtype=bool)
+            for state in states:
+                state_mask[self.by_state.get(state.lower(), [])] = True
+            mask &= state_mask
+
+        if min_uv is not None:
+            mask &= self.uv_values >= min_uv
+
+        if bbox is not None:
+            south, west, north, east = bbox
+            mask &= (self.latitudes >= south) & (self.latitudes <= north)
+            mask &= (self.longitudes >= west) & (self.longitudes <= east)
+
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def cache_key(fields=None, states=None, min_uv=None, bbox=None):
+        """Get the response cache key for a query"""
+        return (
+            tuple(sorted(fields)) if fields else None,
+            tuple(sorted(state.lower() for state in states)) if states else None,
+            min_uv,
+            tuple(bbox) if bbox else None
+        )
+
+    def get_cached(self, **query):
+        """Get the cached serialized response for a query, or None"""
+        key = self.cache_key(**query)
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is None:
+                self._misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def select(self, fields=None, states=None, min_uv=None, bbox=None):
+        """Get the readings matching a query, trimmed to the given fields"""
+        rows = self.query(states=states, min_uv=min_uv, bbox=bbox)
+        if fields:
+            return [{field: self.readings[row][field] for field in fields} for row in rows]
+        return [self.readings[row] for row in rows]
+
+    def store(self, payload, **query):
+        """Cache the serialized response for a query and return it"""
+        key = self.cache_key(**query)
+        with self._lock:
+            self._cache[key] = payload
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return payload
+
+    def stats(self):
+        """Get query cache counters"""
+        with self._lock:
+            return {
+                'version': self.version,
+                'entries': len(self._cache),
+                'hits': self._hits,
+                'misses': self._misses
+            }
+
+
+def parse_station_query(args):
+    """Parse /api/uv-index query parameters
+
+    Returns a dictionary of keyword arguments for StationIndex.get_cached(),
+    select() and store().
+    Raises ValueError with a message for invalid parameters.
+    """
+    query = {}
+
+    fields = args.get('fields')
+    if fields:
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in STATION_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # Keys are serialized sorted anyway, so sorting here normalizes the cache key
+        query['fields'] = sorted(set(fields))
+
+    states = args.get('state')
+    if states:
+        query['states'] = [state.strip() for state in states.split(',') if state.strip()]
+
+    # NaN never equals itself, so it would also miss the response cache every time
+    min_uv = args.get('min_uv')
+    if min_uv:
+        try:
+            query['min_uv'] = float(min_uv)
+        except ValueError:
+            raise ValueError('Invalid min_uv')
+        if not math.isfinite(query['min_uv']):
+            raise ValueError('Invalid min_uv')
+
+    bbox = args.get('bbox')
+    if bbox:
+        try:
+            south, west, north, east = (float(value) for value in bbox.split(','))
+        except ValueError:
+            raise ValueError('Invalid bbox, expected south,west,north,east')
+        if not all(math.isfinite(value) for value in (south, west, north, east)):
+            raise ValueError('Invalid bbox, expected south,west,north,east')
+        query['bbox'] = (south, west, north, east)
+
+    return query
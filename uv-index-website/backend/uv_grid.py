@@ -0,0 +1,88 @@
+"""
+UV raster grid module for UV index website.
+Rasterizes a UV snapshot onto a regular latitude/longitude grid covering
+Australia and its external territories, so the map can draw a heat layer
+without any per-request computation.
+"""
+
+import numpy as np
+
+from interpolation import build_station_arrays, idw_interpolate
+
+# Encoded cell values are UV index * 10 stored as unsigned bytes
+GRID_SCALE = 0.1
+GRID_NODATA = 255
+
+# Number of grid rows interpolated at once, to bound peak memory
+ROW_CHUNK = 32
+
+
+class UVGrid:
+    def __init__(self, version, south, west, north, east, resolution, values):
+        self.version = version
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.resolution = resolution
+        self.values = values
+        self.payload = values.tobytes()
+
+    @property
+    def rows(self):
+        return self.values.shape[0]
+
+    @property
+    def cols(self):
+        return self.values.shape[1]
+
+    def metadata(self):
+        """Describe the grid layout for clients decoding the binary payload"""
+        return {
+            'version': self.version,
+            'bounds': {
+                'south': self.south,
+                'west': self.west,
+                'north': self.north,
+                'east': self.east
+            },
+            'resolution': self.resolution,
+            'rows': self.rows,
+            'cols': self.cols,
+            'encoding': 'uint8',
+            'scale': GRID_SCALE,
+            'nodata': GRID_NODATA,
+            'row_order': 'north_to_south'
+        }
+
+
+def build_uv_grid(stations, version, bounds, resolution, k=4, power=2.0):
+    """Interpolate station readings onto a grid of cell centres
+
+    bounds is (south, west, north, east) in degrees. Row 0 is the northern
+    edge of the grid, matching image row order.
+    """
+    south, west, north, east = bounds
+    usable, station_lats, station_lngs, station_values = build_station_arrays(stations)
+
+    rows = int(round((north - south) / resolution))
+    cols = int(round((east - west) / resolution))
+    values = np.full((rows, cols), GRID_NODATA, dtype=np.uint8)
+    if not usable:
+        return UVGrid(version, south, west, north, east, resolution, values)
+
+    latitudes = north - (np.arange(rows) + 0.5) * resolution
+    longitudes = west + (np.arange(cols) + 0.5) * resolution
+
+    for start in range(0, rows, ROW_CHUNK):
+        chunk_lats = latitudes[start:start + ROW_CHUNK]
+        lat_mesh, lng_mesh = np.meshgrid(chunk_lats, longitudes, indexing='ij')
+        estimates = idw_interpolate(
+            lat_mesh.ravel(), lng_mesh.ravel(),
+            station_lats, station_lngs, station_values,
+            k=k, power=power
+        )[0]
+        encoded = np.clip(np.rint(estimates / GRID_SCALE), 0, GRID_NODATA - 1)
+        values[start:start + len(chunk_lats)] = encoded.reshape(len(chunk_lats), cols)
+
+    return UVGrid(version, south, west, north, east, resolution, values)
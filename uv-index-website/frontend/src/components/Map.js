@@ -38,6 +38,70 @@ const getUVDescription = (uvIndex) => {
   return 'Extreme';
 };
 
+// Get UV index color as RGB, matching the uv-* classes in Map.css
+const getUVColorRGB = (uvIndex) => {
+  if (uvIndex < 3) return [52, 152, 219];
+  if (uvIndex < 6) return [46, 204, 113];
+  if (uvIndex < 8) return [241, 196, 15];
+  if (uvIndex < 11) return [230, 126, 34];
+  return [231, 76, 60];
+};
+
+// Convert latitude to Web Mercator y and back
+const latToMercatorY = (lat) => Math.log(Math.tan(Math.PI / 4 + (lat * Math.PI) / 360));
+const mercatorYToLat = (y) => (360 / Math.PI) * Math.atan(Math.exp(y)) - 90;
+
+// Heat layer drawn from the backend's precomputed UV grid
+function UVHeatLayer({ grid }) {
+  const map = useMap();
+
+  useEffect(() => {
+    if (!grid || !grid.values || grid.values.length !== grid.rows * grid.cols) {
+      return undefined;
+    }
+
+    const { south, west, north, east } = grid.bounds;
+    const canvas = document.createElement('canvas');
+    canvas.width = grid.cols;
+    canvas.height = grid.rows;
+    const context = canvas.getContext('2d');
+    const image = context.createImageData(grid.cols, grid.rows);
+
+    // Grid rows are evenly spaced in latitude, but the map is in Web Mercator,
+    // so each canvas row samples the grid row under its projected latitude
+    const northY = latToMercatorY(north);
+    const southY = latToMercatorY(south);
+    for (let row = 0; row < grid.rows; row++) {
+      const lat = mercatorYToLat(northY + ((row + 0.5) / grid.rows) * (southY - northY));
+      const gridRow = Math.min(grid.rows - 1, Math.max(0, Math.floor((north - lat) / grid.resolution)));
+      for (let col = 0; col < grid.cols; col++) {
+        const value = grid.values[gridRow * grid.cols + col];
+        const offset = (row * grid.cols + col) * 4;
+        if (value === grid.nodata) {
+          continue;
+        }
+        const [r, g, b] = getUVColorRGB(value * grid.scale);
+        image.data[offset] = r;
+        image.data[offset + 1] = g;
+        image.data[offset + 2] = b;
+        image.data[offset + 3] = 255;
+      }
+    }
+    context.putImageData(image, 0, 0);
+
+    const overlay = L.imageOverlay(canvas.toDataURL(), [[south, west], [north, east]], {
+      opacity: 0.35,
+      interactive: false
+    }).addTo(map);
+
+    return () => {
+      map.removeLayer(overlay);
+    };
+  }, [map, grid]);
+
+  return null;
+}
+
 // Component to handle map view changes
 function MapViewHandler({ selectedLocation }) {
   const map = useMap();
@@ -114,6 +178,7 @@ function LocationMarker({ onLocationFound }) {
 
 const UVMap = ({ onUVDataSelected, selectedLocation }) => {
   const [uvData, setUVData] = useState([]);
+  const [uvGrid, setUVGrid] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [lastUpdated, setLastUpdated] = useState(null);
@@ -133,6 +198,12 @@ const UVMap = ({ onUVDataSelected, selectedLocation }) => {
         setUVData(data);
         setError(null);
         setLastUpdated(new Date());
+        
+        // The grid is cached by version, so this is cheap when nothing changed
+        const grid = await api.getUVGrid();
+        if (grid) {
+          setUVGrid(grid);
+        }
       } else {
         console.error('Invalid or empty UV data format:', data);
         setError('Invalid UV data format. Please check API response.');
@@ -205,6 +276,8 @@ const UVMap = ({ onUVDataSelected, selectedLocation }) => {
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
         
+        <UVHeatLayer grid={uvGrid} />
+        
         {filteredUVData && filteredUVData.length > 0 ? filteredUVData.map((location, index) => {
           // Ensure valid coordinates
           if (!location.latitude || !location.longitude || 
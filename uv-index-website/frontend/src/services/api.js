@@ -332,6 +332,23 @@ export const api = {
     }
   },
 
+  // Get the precomputed UV raster grid for the map heat layer
+  getUVGrid: async () => {
+    try {
+      const metadata = await apiClient.get('/uv-index/grid');
+      const grid = await apiClient.get(metadata.data.url.replace(/^\/api/, ''), {
+        responseType: 'arraybuffer'
+      });
+      return {
+        ...metadata.data,
+        values: new Uint8Array(grid.data)
+      };
+    } catch (error) {
+      console.error('Error fetching UV grid:', error);
+      return null;
+    }
+  },
+
   // Get UV index by postcode
   getUVIndexByPostcode: async (postcode) => {
     try {